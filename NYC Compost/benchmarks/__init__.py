@@ -0,0 +1,51 @@
+import os
+from contextlib import contextmanager
+
+import django
+
+
+def setup():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "user_management.settings")
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    # benchmarks run against a throwaway database, like the test suite
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def seed_users(start, stop):
+    # users without a usable password, with profiles but no signals
+    from django.contrib.auth.models import User
+
+    from users.models import Profile
+
+    for offset in range(start, stop, 5000):
+        end = min(offset + 5000, stop)
+        User.objects.bulk_create(
+            User(username=f"user{i}", email=f"User{i}@Example.com", password="!")
+            for i in range(offset, end)
+        )
+        # SQLite does not return the new primary keys from bulk_create
+        users = User.objects.filter(
+            username__in=[f"user{i}" for i in range(offset, end)]
+        )
+        Profile.objects.bulk_create(
+            Profile(user_id=pk, email_lower=email.lower())
+            for pk, email in users.values_list("pk", "email")
+        )
@@ -0,0 +1,82 @@
+"""
+Cost of finding out a username is taken: availability check vs form POST.
+
+    $ python -m benchmarks.availability [--users 100000] [--requests 500]
+
+Seeds --users accounts, builds the Bloom filter and reports its size and
+build time, then times the availability endpoint for free and taken names
+against posting the register form with a taken username. Times and query
+counts come from the request metrics middleware.
+"""
+import argparse
+import time
+
+from benchmarks import percentile, seed_users, setup, test_database
+
+
+def run(request, requests):
+    total_ms, queries = [], 0
+    for i in range(requests):
+        sample = request(i).request_metrics
+        total_ms.append(sample["total_ms"])
+        queries = max(queries, sample["queries"])
+    return percentile(total_ms, 0.5), queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    setup()
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from users.availability import build_filter
+
+    with test_database(), override_settings(THROTTLE_ENABLED=False):
+        seed_users(0, args.users)
+        begin = time.perf_counter()
+        bloom = build_filter()
+        print(
+            f"filter: {args.users} users, {len(bloom.bits) / 1024:.0f} KiB, "
+            f"{bloom.hashes} hashes, built in {time.perf_counter() - begin:.2f} s"
+        )
+
+        client = Client()
+        url = reverse("users-availability")
+        cases = [
+            ("check free username", lambda i: client.get(url, {"username": f"x{i}"})),
+            (
+                "check taken username",
+                lambda i: client.get(url, {"username": f"user{i}"}),
+            ),
+            (
+                "check free email",
+                lambda i: client.get(url, {"email": f"x{i}@example.com"}),
+            ),
+            (
+                "register POST, taken",
+                lambda i: client.post(
+                    reverse("users-register"),
+                    {
+                        "first_name": "Bench",
+                        "last_name": "User",
+                        "username": f"user{i}",
+                        "email": f"new{i}@example.com",
+                        "password1": "Turn-the-pile-4821",
+                        "password2": "Turn-the-pile-4821",
+                    },
+                ),
+            ),
+        ]
+
+        print(f"{'':<24}{'p50 ms':>9}{'queries':>9}")
+        for name, request in cases:
+            p50, queries = run(request, args.requests)
+            print(f"{name:<24}{p50:>9.3f}{queries:>9}")
+
+
+if __name__ == "__main__":
+    main()
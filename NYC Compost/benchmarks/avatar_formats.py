@@ -0,0 +1,66 @@
+"""
+Bytes per avatar variant in each encoded format.
+
+    $ python -m benchmarks.avatar_formats [image ...]
+
+Without arguments every upload under media/profile_images is measured.
+"""
+import argparse
+import glob
+import os
+import tempfile
+
+from users.images import VARIANT_EXTENSIONS, generate_variants
+
+SIZES = [40, 64, 100, 200]
+
+
+def measure(source, directory):
+    targets = [(size, os.path.join(directory, f"bench-{size}.jpg")) for size in SIZES]
+    generate_variants(source, targets)
+
+    totals = dict.fromkeys(VARIANT_EXTENSIONS, 0)
+    for _, path in targets:
+        base = os.path.splitext(path)[0]
+        for extension in VARIANT_EXTENSIONS:
+            encoded = f"{base}.{extension}"
+            totals[extension] += os.path.getsize(encoded)
+            os.remove(encoded)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("images", nargs="*")
+    args = parser.parse_args()
+
+    images = args.images or sorted(
+        path
+        for path in glob.glob(os.path.join("media", "profile_images", "*"))
+        if os.path.isfile(path)
+    )
+    if not images:
+        parser.error("no images to measure")
+
+    grand = dict.fromkeys(VARIANT_EXTENSIONS, 0)
+    with tempfile.TemporaryDirectory() as directory:
+        for source in images:
+            totals = measure(source, directory)
+            sizes = ", ".join(f"{ext} {totals[ext]:>7} B" for ext in VARIANT_EXTENSIONS)
+            print(f"{os.path.basename(source)[:40]:<40} {sizes}")
+            for extension, size in totals.items():
+                grand[extension] += size
+
+    jpeg = grand["jpg"] / len(images)
+    print(f"\nAverage bytes per avatar over {len(images)} images (all sizes):")
+    for extension in VARIANT_EXTENSIONS:
+        average = grand[extension] / len(images)
+        saved = jpeg - average
+        print(
+            f"  {extension:<5} {average:>9.0f} B  saved {saved:>8.0f} B "
+            f"({saved / jpeg:.0%}) vs JPEG"
+        )
+
+
+if __name__ == "__main__":
+    main()
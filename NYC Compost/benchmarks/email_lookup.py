@@ -0,0 +1,60 @@
+"""
+Password reset lookup time as the user table grows.
+
+    $ python -m benchmarks.email_lookup [--sizes 10000,100000,1000000] [--lookups 200]
+
+Compares Django's PasswordResetForm.get_users, which filters auth_user with
+email__iexact, against ResetPasswordForm.get_users, which uses the indexed
+Profile.email_lower. Half of the lookups are for addresses that do not exist.
+"""
+import argparse
+import random
+import time
+
+from benchmarks import percentile, seed_users, setup, test_database
+
+
+def run(form, size, lookups):
+    emails = [
+        f"user{random.randrange(size)}@example.com"
+        if i % 2
+        else f"nobody{i}@example.com"
+        for i in range(lookups)
+    ]
+
+    latencies = []
+    for email in emails:
+        begin = time.perf_counter()
+        list(form.get_users(email))
+        latencies.append(time.perf_counter() - begin)
+    return percentile(latencies, 0.5) * 1000, percentile(latencies, 0.99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    setup()
+    from django.contrib.auth.forms import PasswordResetForm
+
+    from users.forms import ResetPasswordForm
+
+    with test_database():
+        print(f"{'users':>9}{'lookup':>10}{'p50 ms':>9}{'p99 ms':>9}")
+        seeded = 0
+        for size in sizes:
+            seed_users(seeded, size)
+            seeded = size
+            for name, form in (
+                ("iexact", PasswordResetForm()),
+                ("indexed", ResetPasswordForm()),
+            ):
+                p50, p99 = run(form, size, args.lookups)
+                print(f"{size:>9}{name:>10}{p50:>9.3f}{p99:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+Load test of the account flows over HTTP against an in-process server.
+
+    $ python -m benchmarks.flows [--journeys 50] [--concurrency 4] [--users 10000]
+    $ python -m benchmarks.flows --save flows
+    $ python -m benchmarks.flows --compare flows [--tolerance 0.25]
+
+Each journey registers a new account, logs in (every other one with
+remember_me), views and updates the profile with an avatar upload, changes
+the password and resets it through the emailed link. The server runs on a
+throwaway SQLite file seeded with --users accounts. Passwords are hashed
+with MD5 unless --real-hasher is given.
+
+Baselines are saved to benchmarks/baselines/<name>.json. --compare exits
+with status 1 when a step needs more queries than its baseline, or its p50
+latency grew by more than --tolerance.
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import re
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
+from benchmarks import percentile, seed_users, setup
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines")
+
+_queries = {}
+
+
+def instrumented(application):
+    # the metrics middleware leaves its sample on the response object,
+    # which the WSGI handler hands back to the server
+    def wrapper(environ, start_response):
+        response = application(environ, start_response)
+        sample = getattr(response, "request_metrics", None)
+        if sample is not None and "HTTP_X_BENCH_ID" in environ:
+            _queries[environ["HTTP_X_BENCH_ID"]] = sample["queries"]
+        return response
+
+    return wrapper
+
+
+def serve():
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+
+    class QuietHandler(WSGIRequestHandler):
+        def setup(self):
+            super().setup()
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadedWSGIServer(("127.0.0.1", 0), QuietHandler)
+    server.set_app(instrumented(WSGIHandler()))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"'
+            f"\r\n\r\n{value}\r\n".encode()
+        )
+    for name, (filename, content, content_type) in files.items():
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+            f'filename="{filename}"\r\nContent-Type: {content_type}\r\n\r\n'.encode()
+        )
+        body.write(content + b"\r\n")
+    body.write(f"--{boundary}--\r\n".encode())
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+class Connection(http.client.HTTPConnection):
+    # without this, delayed ACKs add 40 ms to requests sent in two segments
+    def connect(self):
+        super().connect()
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class Browser:
+    # one keep-alive connection and a cookie jar, like a single visitor
+    def __init__(self, port, timings):
+        self.connection = Connection("127.0.0.1", port, timeout=60)
+        self.cookies = {}
+        self.timings = timings
+
+    def request(self, step, method, path, fields=None, files=None, expect=None):
+        request_id = uuid.uuid4().hex
+        headers = {"X-Bench-Id": request_id}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        body = None
+        if fields is not None:
+            body, headers["Content-Type"] = multipart(fields, files or {})
+            headers["X-CSRFToken"] = self.cookies.get("csrftoken", "")
+
+        begin = time.perf_counter()
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        content = response.read()
+        elapsed = time.perf_counter() - begin
+
+        for header in response.headers.get_all("Set-Cookie") or []:
+            for name, morsel in SimpleCookie(header).items():
+                if morsel["max-age"] == "0":
+                    self.cookies.pop(name, None)
+                else:
+                    self.cookies[name] = morsel.value
+
+        # every form posted here redirects, while invalid ones come back as 200
+        if response.status != (expect or (302 if fields is not None else 200)):
+            raise RuntimeError(f"{step}: {method} {path} returned {response.status}")
+        self.timings.append((step, elapsed, _queries.pop(request_id, 0)))
+        return response, content.decode(errors="replace")
+
+
+def journey(index, port, avatar, timings):
+    from django.core import mail
+
+    browser = Browser(port, timings)
+    username = f"bench-{index}-{uuid.uuid4().hex[:6]}"
+    email = f"{username}@example.com"
+    password = "Turn-the-pile-4821"
+
+    browser.request("register_get", "GET", "/register/")
+    browser.request(
+        "register",
+        "POST",
+        "/register/",
+        {
+            "first_name": "Bench",
+            "last_name": "User",
+            "username": username,
+            "email": email,
+            "password1": password,
+            "password2": password,
+        },
+    )
+
+    login = {"username": username, "password": password}
+    if index % 2:
+        login["remember_me"] = "on"
+    browser.request("login_get", "GET", "/login/")
+    browser.request(
+        "login_remember" if index % 2 else "login", "POST", "/login/", login
+    )
+
+    browser.request("profile_get", "GET", "/profile/")
+    browser.request(
+        "profile_post",
+        "POST",
+        "/profile/",
+        {"username": username, "email": email, "bio": f"Composting since {index}"},
+        {"avatar": (f"{username}.jpg", avatar, "image/jpeg")},
+    )
+
+    new_password = password + "-2"
+    browser.request(
+        "password_change",
+        "POST",
+        "/password-change/",
+        {
+            "old_password": password,
+            "new_password1": new_password,
+            "new_password2": new_password,
+        },
+    )
+
+    browser.request("logout", "GET", "/logout/")
+    browser.request("password_reset", "POST", "/password-reset/", {"email": email})
+    message = next(m for m in reversed(mail.outbox) if m.to == [email])
+    link = re.search(r"/password-reset-confirm/[^/\s]+/[^/\s]+/", message.body).group()
+    response, _ = browser.request("reset_confirm", "GET", link, expect=302)
+    browser.request(
+        "reset_set",
+        "POST",
+        response.headers["Location"],
+        {"new_password1": password, "new_password2": password},
+    )
+
+
+def avatar_image():
+    from PIL import Image
+
+    image = Image.linear_gradient("L").resize((800, 800)).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def summarize(timings, elapsed, journeys):
+    steps = {}
+    for step, seconds, queries in timings:
+        entry = steps.setdefault(step, {"latencies": [], "queries": []})
+        entry["latencies"].append(seconds)
+        entry["queries"].append(queries)
+
+    return {
+        "journeys_per_second": journeys / elapsed,
+        "steps": {
+            step: {
+                "requests": len(entry["latencies"]),
+                "p50_ms": percentile(entry["latencies"], 0.5) * 1000,
+                "p95_ms": percentile(entry["latencies"], 0.95) * 1000,
+                "p99_ms": percentile(entry["latencies"], 0.99) * 1000,
+                "queries": max(entry["queries"]),
+            }
+            for step, entry in steps.items()
+        },
+    }
+
+
+def compare(result, baseline, tolerance):
+    regressions = 0
+    print(f"{'step':<18}{'p50 ms':>9}{'baseline':>10}{'change':>9}{'queries':>9}")
+    for step, current in result["steps"].items():
+        before = baseline["steps"].get(step)
+        if before is None:
+            print(f"{step:<18}{current['p50_ms']:>9.2f}{'-':>10}")
+            continue
+        change = current["p50_ms"] / before["p50_ms"] - 1
+        flags = []
+        if change > tolerance:
+            flags.append("slower")
+        if current["queries"] > before["queries"]:
+            flags.append("more queries")
+        regressions += bool(flags)
+        print(
+            f"{step:<18}{current['p50_ms']:>9.2f}{before['p50_ms']:>10.2f}"
+            f"{change:>+9.0%}{before['queries']:>4} -> {current['queries']:<3}"
+            f" {' '.join(flags)}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--journeys", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--real-hasher", action="store_true")
+    parser.add_argument("--save", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["SQLITE_PATH"] = os.path.join(directory, "bench.sqlite3")
+        setup()
+        from django.conf import settings
+        from django.core.management import call_command
+        from django.test import override_settings
+        from django.test.utils import setup_test_environment
+
+        hashers = settings.PASSWORD_HASHERS
+        if not args.real_hasher:
+            hashers = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+        # emails are collected in mail.outbox
+        setup_test_environment()
+        call_command("migrate", verbosity=0)
+        seed_users(0, args.users)
+
+        with override_settings(
+            PASSWORD_HASHERS=hashers,
+            MEDIA_ROOT=os.path.join(directory, "media"),
+            THROTTLE_ENABLED=False,
+            ALLOWED_HOSTS=["*"],
+        ):
+            server = serve()
+            port = server.server_address[1]
+            avatar = avatar_image()
+            timings = []
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                for future in [
+                    pool.submit(journey, i, port, avatar, timings)
+                    for i in range(args.journeys)
+                ]:
+                    future.result()
+            elapsed = time.perf_counter() - started
+            server.shutdown()
+
+    result = summarize(timings, elapsed, args.journeys)
+    result["options"] = {
+        "journeys": args.journeys,
+        "concurrency": args.concurrency,
+        "users": args.users,
+        "real_hasher": args.real_hasher,
+    }
+
+    print(f"{args.journeys / elapsed:.1f} journeys/s")
+    print(
+        f"{'step':<18}{'requests':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}"
+    )
+    for step, stats in result["steps"].items():
+        print(
+            f"{step:<18}{stats['requests']:>9}{stats['p50_ms']:>9.2f}"
+            f"{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['queries']:>9}"
+        )
+
+    if args.save:
+        os.makedirs(BASELINES, exist_ok=True)
+        with open(os.path.join(BASELINES, f"{args.save}.json"), "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.compare:
+        with open(os.path.join(BASELINES, f"{args.compare}.json")) as f:
+            baseline = json.load(f)
+        print()
+        if baseline["options"] != result["options"]:
+            print(f"Baseline was recorded with {baseline['options']}")
+        if compare(result, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
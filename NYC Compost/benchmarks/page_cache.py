@@ -0,0 +1,64 @@
+"""
+Anonymous page latency with and without the page cache.
+
+    $ python -m benchmarks.page_cache [--requests 500]
+
+Requests each page in PAGE_CACHE_VIEWS as a visitor without a session,
+first with the cache turned off and then with a warm cache. Times and query
+counts come from the request metrics middleware.
+"""
+import argparse
+
+from benchmarks import percentile, setup, test_database
+
+PAGES = [
+    ("home", "users-home"),
+    ("login", "login"),
+    ("register", "users-register"),
+    ("password reset", "password_reset"),
+]
+
+
+def run(client, url, requests):
+    total_ms, queries = [], 0
+    for _ in range(requests):
+        sample = client.get(url).request_metrics
+        total_ms.append(sample["total_ms"])
+        queries = max(queries, sample["queries"])
+    return percentile(total_ms, 0.5), percentile(total_ms, 0.99), queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from users.page_cache import clear_page_cache
+
+    with test_database():
+        results = {}
+        for name, views in (
+            ("uncached", []),
+            ("page cache", settings.PAGE_CACHE_VIEWS),
+        ):
+            with override_settings(PAGE_CACHE_VIEWS=views):
+                clear_page_cache()
+                for page, url_name in PAGES:
+                    client = Client()
+                    client.get(reverse(url_name))
+                    results[page, name] = run(client, reverse(url_name), args.requests)
+
+        print(f"{'page':<16}{'':>12}{'p50 ms':>9}{'p99 ms':>9}{'queries':>9}")
+        for page, _ in PAGES:
+            for name in ("uncached", "page cache"):
+                p50, p99, queries = results[page, name]
+                print(f"{page:<16}{name:>12}{p50:>9.3f}{p99:>9.3f}{queries:>9}")
+
+
+if __name__ == "__main__":
+    main()
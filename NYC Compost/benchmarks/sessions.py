@@ -0,0 +1,102 @@
+"""
+Login throughput for each session backend.
+
+    $ python -m benchmarks.sessions [--logins 200] [--real-hasher]
+
+Passwords are hashed with MD5 unless --real-hasher is given, so that the
+session store rather than PBKDF2 dominates the timings. Each login is followed
+by a profile page view with the new session.
+"""
+import argparse
+import tempfile
+import time
+
+from benchmarks import percentile, setup, test_database
+
+ENGINES = {
+    "db": "users.sessions.db",
+    "cached_db": "users.sessions.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+
+
+def run(engine, logins):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+
+    latencies = []
+    writes = 0
+    started = time.perf_counter()
+    for i in range(logins):
+        client = Client()
+        data = {"username": "bench", "password": "bench-pass"}
+        if i % 2:
+            data["remember_me"] = "on"
+
+        with CaptureQueriesContext(connection) as queries:
+            begin = time.perf_counter()
+            client.post(reverse("login"), data)
+            client.get(reverse("users-profile"))
+            latencies.append(time.perf_counter() - begin)
+
+        writes += sum(
+            1
+            for query in queries
+            if "django_session" in query["sql"]
+            and not query["sql"].startswith("SELECT")
+        )
+    elapsed = time.perf_counter() - started
+
+    return {
+        "logins_per_second": logins / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "session_writes_per_login": writes / logins,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--real-hasher", action="store_true")
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test import override_settings
+
+    hashers = settings.PASSWORD_HASHERS
+    if not args.real_hasher:
+        hashers = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+    with test_database(), tempfile.TemporaryDirectory() as cache_dir:
+        caches = dict(settings.CACHES)
+        caches["sessions"] = {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": cache_dir,
+        }
+
+        with override_settings(
+            PASSWORD_HASHERS=hashers, CACHES=caches, THROTTLE_ENABLED=False
+        ):
+            User.objects.create_user(username="bench", password="bench-pass")
+
+            print(
+                f"{'backend':<16}{'logins/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'writes':>8}"
+            )
+            for backend, engine in ENGINES.items():
+                with override_settings(SESSION_ENGINE=engine):
+                    result = run(engine, args.logins)
+                print(
+                    f"{backend:<16}{result['logins_per_second']:>10.1f}"
+                    f"{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+                    f"{result['session_writes_per_login']:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
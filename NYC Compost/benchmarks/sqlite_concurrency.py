@@ -0,0 +1,146 @@
+"""
+Read latency on SQLite while registrations and profile updates are written.
+
+    $ python -m benchmarks.sqlite_concurrency [--seconds 5] [--readers 4] [--writers 2]
+
+Runs against a throwaway database file, once with SQLite's defaults (rollback
+journal, synchronous=FULL) and once with SQLITE_PRAGMAS from the settings.
+Readers load users with their profiles the way the session backend does;
+writers alternate between registering a user and saving a profile.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks import percentile, setup
+
+DEFAULT_PRAGMAS = {"journal_mode": "delete", "synchronous": "full"}
+
+
+def reader(user_ids, stop, latencies, errors):
+    from django.contrib.auth.models import User
+    from django.db import OperationalError, connection
+
+    try:
+        while not stop.is_set():
+            begin = time.perf_counter()
+            try:
+                User.objects.select_related("profile").get(pk=random.choice(user_ids))
+            except OperationalError:
+                errors.append(1)
+                continue
+            latencies.append(time.perf_counter() - begin)
+    finally:
+        connection.close()
+
+
+def writer(index, user_ids, stop, writes, errors):
+    from django.contrib.auth.models import User
+    from django.db import OperationalError, connection
+
+    from users.models import Profile
+
+    count = 0
+    try:
+        while not stop.is_set():
+            try:
+                if count % 2:
+                    profile = Profile.objects.get(user_id=random.choice(user_ids))
+                    profile.bio = f"bio {index}-{count}"
+                    profile.save()
+                else:
+                    User.objects.create_user(
+                        username=f"writer{index}-{count}-{time.monotonic_ns()}",
+                        password="bench-pass",
+                    )
+                writes.append(1)
+            except OperationalError:
+                errors.append(1)
+            count += 1
+    finally:
+        connection.close()
+
+
+def run(pragmas, user_ids, args):
+    from django.db import connection
+    from django.test import override_settings
+
+    connection.close()
+    with override_settings(SQLITE_PRAGMAS=pragmas):
+        # a new connection switches the journal mode of the file
+        connection.ensure_connection()
+        connection.close()
+
+        stop = threading.Event()
+        latencies, writes, errors = [], [], []
+        threads = [
+            threading.Thread(target=reader, args=(user_ids, stop, latencies, errors))
+            for _ in range(args.readers)
+        ] + [
+            threading.Thread(target=writer, args=(i, user_ids, stop, writes, errors))
+            for i in range(args.writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    return {
+        "reads_per_second": len(latencies) / args.seconds,
+        "writes_per_second": len(writes) / args.seconds,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["SQLITE_PATH"] = os.path.join(directory, "bench.sqlite3")
+        setup()
+        from django.conf import settings
+        from django.contrib.auth.models import User
+        from django.core.management import call_command
+        from django.test import override_settings
+
+        call_command("migrate", verbosity=0)
+        with override_settings(
+            PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"]
+        ):
+            user_ids = [
+                User.objects.create_user(username=f"bench{i}", password="bench-pass").pk
+                for i in range(args.users)
+            ]
+
+            print(
+                f"{'pragmas':<10}{'reads/s':>10}{'writes/s':>10}"
+                f"{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}"
+            )
+            for name, pragmas in (
+                ("default", DEFAULT_PRAGMAS),
+                ("tuned", settings.SQLITE_PRAGMAS),
+            ):
+                result = run(pragmas, user_ids, args)
+                print(
+                    f"{name:<10}{result['reads_per_second']:>10.1f}"
+                    f"{result['writes_per_second']:>10.1f}{result['p50_ms']:>9.2f}"
+                    f"{result['p99_ms']:>9.2f}{result['max_ms']:>9.2f}"
+                    f"{result['errors']:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
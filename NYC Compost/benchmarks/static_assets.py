@@ -0,0 +1,152 @@
+"""
+First visit cost of the front-end libraries, served from CDNs or self-hosted.
+
+    $ python -m benchmarks.static_assets [--rtt 150] [--throughput 1600]
+
+Runs collectstatic with the compressed manifest storage into a temporary
+directory and requests every vendored asset through the static layer, the
+way a browser sending "Accept-Encoding: br, gzip" would. The transfer is
+then simulated the way Lighthouse throttles a page load, on slow 4G by
+default: every new origin costs DNS, TCP and TLS round trips before its
+first request, and responses share the bottleneck bandwidth. CDN responses
+are counted at their gzip size. Assets not vendored yet (see `manage.py
+vendor_static`) come from their CDN in both cases and are counted with
+their connection setup but without their unknown size.
+"""
+import argparse
+import tempfile
+from urllib.parse import urlsplit
+
+from benchmarks import setup
+
+# DNS, TCP handshake and a TLS 1.2 handshake
+SETUP_ROUND_TRIPS = 4
+
+
+def simulate(assets, rtt, throughput):
+    # assets are (origin, bytes, render blocking); None is the page origin,
+    # whose connection is already open
+    ready = {}
+    starts = []
+    for origin, size, blocking in assets:
+        if origin is not None and origin not in ready:
+            ready[origin] = SETUP_ROUND_TRIPS * rtt
+        starts.append((ready.get(origin, 0) + rtt, size, blocking))
+
+    link_free = 0
+    render_blocking = finished = 0
+    for start, size, blocking in sorted(starts, key=lambda s: s[0]):
+        link_free = max(link_free, start) + size * 8 / throughput
+        finished = max(finished, link_free)
+        if blocking:
+            render_blocking = max(render_blocking, link_free)
+    return {
+        "requests": len(assets),
+        "origins": len(ready),
+        "bytes": sum(size for _, size, _ in assets),
+        "render_blocking_ms": render_blocking,
+        "loaded_ms": finished,
+    }
+
+
+def collect(directory):
+    from django.contrib.staticfiles.storage import staticfiles_storage
+    from django.core.management import call_command
+
+    from users.wsgi_static import StaticFiles
+
+    call_command("collectstatic", interactive=False, verbosity=0)
+
+    def not_found(environ, start_response):
+        start_response("404 Not Found", [])
+        return []
+
+    return staticfiles_storage, StaticFiles(not_found, directory, "/static/")
+
+
+def served_size(static_files, url, accept_encoding):
+    environ = {
+        "PATH_INFO": url,
+        "REQUEST_METHOD": "GET",
+        "HTTP_ACCEPT_ENCODING": accept_encoding,
+    }
+    response = {}
+
+    def start_response(status, headers):
+        response["status"] = status
+        response["headers"] = dict(headers)
+
+    body = b"".join(static_files(environ, start_response))
+    if not response["status"].startswith("200"):
+        raise RuntimeError(f"{url} returned {response['status']}")
+    return len(body), response["headers"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rtt", type=float, default=150, help="Round trip in ms")
+    parser.add_argument(
+        "--throughput", type=float, default=1600, help="Bottleneck in kbit/s"
+    )
+    args = parser.parse_args()
+
+    setup()
+    from django.test import override_settings
+
+    from users.assets import VENDOR_ASSETS, is_vendored
+
+    cdn, self_hosted = [], []
+    rows = []
+    with tempfile.TemporaryDirectory() as directory, override_settings(
+        DEBUG=False,
+        STATIC_ROOT=directory,
+        STATICFILES_STORAGE="users.storage.CompressedManifestStaticFilesStorage",
+    ):
+        storage, static_files = collect(directory)
+        for name, asset in VENDOR_ASSETS.items():
+            origin = urlsplit(asset["url"]).netloc
+            blocking = name.endswith(".css")
+            if not is_vendored(name):
+                cdn.append((origin, 0, blocking))
+                self_hosted.append((origin, 0, blocking))
+                rows.append((name, "-", "-", "-", "not vendored"))
+                continue
+
+            url = storage.url(asset["path"])
+            identity, _ = served_size(static_files, url, "")
+            gzipped, _ = served_size(static_files, url, "gzip")
+            size, headers = served_size(static_files, url, "br, gzip")
+            cdn.append((origin, gzipped, blocking))
+            self_hosted.append((None, size, blocking))
+            rows.append(
+                (
+                    name,
+                    identity,
+                    gzipped,
+                    size,
+                    f"{headers.get('Content-Encoding', 'identity')}, "
+                    f"{headers['Cache-Control']}",
+                )
+            )
+
+    print(f"{'asset':<28}{'bytes':>9}{'gzip':>9}{'served':>9}  served as")
+    for name, identity, gzipped, size, served_as in rows:
+        print(f"{name:<28}{identity:>9}{gzipped:>9}{size:>9}  {served_as}")
+
+    print()
+    print(f"Simulated first visit, RTT {args.rtt:g} ms, {args.throughput:g} kbit/s")
+    print(
+        f"{'':<14}{'requests':>9}{'origins':>9}{'bytes':>9}"
+        f"{'render blocking ms':>20}{'loaded ms':>11}"
+    )
+    for label, assets in (("CDNs", cdn), ("self-hosted", self_hosted)):
+        result = simulate(assets, args.rtt, args.throughput)
+        print(
+            f"{label:<14}{result['requests']:>9}{result['origins']:>9}"
+            f"{result['bytes']:>9}{result['render_blocking_ms']:>20.0f}"
+            f"{result['loaded_ms']:>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Template render time per view with and without template caching.
+
+    $ python -m benchmarks.templates [--renders 300]
+
+Compares reparsing templates on every render (the filesystem and app
+directories loaders with DEBUG settings) with the cached loader. Times come
+from the request metrics middleware.
+"""
+import argparse
+import copy
+
+from benchmarks import percentile, setup, test_database
+
+PAGES = [
+    ("home", "users-home", False),
+    ("home (signed in)", "users-home", True),
+    ("login", "login", False),
+    ("register", "users-register", False),
+    ("password reset", "password_reset", False),
+    ("profile", "users-profile", True),
+]
+
+
+def configurations(settings):
+    loaders = [
+        "django.template.loaders.filesystem.Loader",
+        "django.template.loaders.app_directories.Loader",
+    ]
+    for name, cached in (("uncached", False), ("cached loader", True)):
+        templates = copy.deepcopy(settings.TEMPLATES)
+        templates[0]["OPTIONS"]["loaders"] = (
+            [("django.template.loaders.cached.Loader", loaders)] if cached else loaders
+        )
+        # whole cached pages would skip the rendering being measured
+        yield name, cached, {
+            "TEMPLATES": templates,
+            "PAGE_CACHE_VIEWS": [],
+        }
+
+
+def run(client, url, renders):
+    template_ms, total_ms = [], []
+    for _ in range(renders):
+        sample = client.get(url).request_metrics
+        template_ms.append(sample["template_ms"])
+        total_ms.append(sample["total_ms"])
+    return percentile(template_ms, 0.5), percentile(total_ms, 0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--renders", type=int, default=300)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from users.template_cache import warm_templates
+
+    with test_database():
+        user = User.objects.create_user(username="bench", first_name="bench")
+        anonymous, signed_in = Client(), Client()
+        signed_in.force_login(user)
+
+        results = {}
+        for name, cached, overrides in configurations(settings):
+            with override_settings(**overrides):
+                if cached:
+                    warm_templates()
+                for page, url_name, authenticated in PAGES:
+                    client = signed_in if authenticated else anonymous
+                    results[page, name] = run(client, reverse(url_name), args.renders)
+
+        names = [name for name, _, _ in configurations(settings)]
+        print(f"{'page':<18}" + "".join(f"{name:>22}" for name in names))
+        print(f"{'':<18}" + "".join(f"{'template / total ms':>22}" for _ in names))
+        for page, _, _ in PAGES:
+            print(
+                f"{page:<18}"
+                + "".join(
+                    f"{results[page, name][0]:>13.3f} /{results[page, name][1]:>6.2f}"
+                    for name in names
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+CPU spent on a credential-stuffing burst against the login form.
+
+    $ python -m benchmarks.throttle [--attempts 40] [--accounts 5]
+
+The burst comes from one client IP and cycles through a few accounts, with
+the project's real password hasher. CPU time is reported with throttling on
+and off.
+"""
+import argparse
+import logging
+import time
+
+from benchmarks import setup, test_database
+
+
+def burst(attempts, accounts, enabled):
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    cache.clear()
+    client = Client()
+    statuses = {}
+
+    with override_settings(THROTTLE_ENABLED=enabled):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        for i in range(attempts):
+            response = client.post(
+                reverse("login"),
+                {"username": f"victim{i % accounts}", "password": f"guess{i}"},
+            )
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        cpu = time.process_time() - cpu
+        wall = time.perf_counter() - wall
+
+    return cpu, wall, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--attempts", type=int, default=40)
+    parser.add_argument("--accounts", type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    logging.disable(logging.WARNING)
+    from django.contrib.auth.models import User
+
+    with test_database():
+        for i in range(args.accounts):
+            User.objects.create_user(username=f"victim{i}", password="correct-horse")
+
+        print(
+            f"{'throttling':<12}{'cpu s':>8}{'wall s':>8}{'cpu ms/req':>12}  statuses"
+        )
+        for enabled in (False, True):
+            cpu, wall, statuses = burst(args.attempts, args.accounts, enabled)
+            print(
+                f"{'on' if enabled else 'off':<12}{cpu:>8.2f}{wall:>8.2f}"
+                f"{cpu / args.attempts * 1000:>12.1f}  {statuses}"
+            )
+
+
+if __name__ == "__main__":
+    main()
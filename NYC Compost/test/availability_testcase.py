@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from users import availability
+from users.availability import BloomFilter, add_user, build_filter
+
+
+class BloomFilterTestCase(SimpleTestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'user{i}')
+
+        self.assertTrue(all(f'user{i}' in bloom for i in range(1000)))
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'user{i}')
+
+        false_positives = sum(f'other{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class AvailabilityTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(setattr, availability, '_filter', None)
+        User.objects.create_user(username='testuser', email='TestUser@Example.com')
+        build_filter()
+
+    def check(self, **params):
+        response = self.client.get(reverse('users-availability'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_free_names_never_query(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.check(username='newuser', email='newuser@example.com'),
+                {'username': 'available', 'email': 'available'},
+            )
+
+    def test_taken(self):
+        self.assertEqual(
+            self.check(username='testuser', email=' testuser@example.COM'),
+            {'username': 'taken', 'email': 'taken'},
+        )
+
+    def test_invalid_values_never_query(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.check(username='no spaces', email='not-an-email'),
+                {'username': 'invalid', 'email': 'invalid'},
+            )
+
+    def test_new_users_are_added(self):
+        User.objects.create_user(username='newuser', email='newuser@example.com')
+
+        self.assertEqual(
+            self.check(username='newuser', email='newuser@example.com'),
+            {'username': 'taken', 'email': 'taken'},
+        )
+
+    def test_users_added_during_a_rebuild_are_kept(self):
+        def new_filter(*args):
+            # a user registers after the rebuild has counted the users
+            add_user('latecomer', 'late@example.com')
+            return BloomFilter(*args)
+
+        with mock.patch.object(availability, 'BloomFilter', side_effect=new_filter):
+            bloom = build_filter()
+
+        self.assertIn('username:latecomer', bloom)
+        self.assertIn('email:late@example.com', bloom)
+        self.assertIsNone(availability._pending)
+
+    def test_filter_is_built_on_first_check(self):
+        availability._filter = None
+
+        self.assertEqual(self.check(username='testuser'), {'username': 'taken'})
+        self.assertIsNotNone(availability._filter)
+
+    @override_settings(THROTTLE_RATES={'availability_ip': '2/m'})
+    def test_throttled(self):
+        self.check(username='a')
+        self.check(username='b')
+
+        response = self.client.get(reverse('users-availability'), {'username': 'c'})
+        self.assertEqual(response.status_code, 429)
@@ -0,0 +1,155 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from users.jobs import claim_jobs, fail_job
+from users.management.commands.avatar_worker import Command as AvatarWorker
+from users.models import AvatarJob
+from users.testing import TemporaryMediaMixin, make_image
+
+
+def crash(*args, **kwargs):
+    os._exit(1)
+
+
+@override_settings(AVATAR_ASYNC_PROCESSING=True)
+class AvatarJobTestCase(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.profile = self.user.profile
+
+    def test_upload_is_queued_not_resized(self):
+        self.profile.avatar = make_image()
+        self.profile.save()
+
+        # The original stays in place until the worker picks the job up
+        job = AvatarJob.objects.get(profile=self.profile)
+        self.assertEqual(job.status, AvatarJob.PENDING)
+        with Image.open(self.profile.avatar.path) as img:
+            self.assertEqual(img.size, (300, 200))
+
+    def test_worker_resizes_avatar(self):
+        self.profile.avatar = make_image()
+        self.profile.save()
+
+        call_command('avatar_worker', once=True, workers=1, stdout=StringIO())
+
+        job = AvatarJob.objects.get(profile=self.profile)
+        self.assertEqual(job.status, AvatarJob.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.profile.refresh_from_db()
+        self.assertTrue(self.profile.avatar_ready)
+        self.assertIn('-100.jpg', self.profile.avatar_src)
+
+    def test_thread_workers_do_not_record_peak_rss(self):
+        self.profile.avatar = make_image()
+        self.profile.save()
+
+        out = StringIO()
+        call_command('avatar_worker', once=True, workers=1, stdout=out)
+
+        self.assertIsNone(AvatarJob.objects.get(profile=self.profile).peak_rss)
+        self.assertIn('process peak RSS', out.getvalue())
+
+    def test_process_workers_record_peak_rss(self):
+        self.profile.avatar = make_image()
+        self.profile.save()
+
+        out = StringIO()
+        call_command('avatar_worker', once=True, workers=1, processes=True, stdout=out)
+
+        self.assertGreater(AvatarJob.objects.get(profile=self.profile).peak_rss, 0)
+        self.assertIn('peak RSS per job', out.getvalue())
+
+    def test_default_avatar_is_not_queued(self):
+        self.profile.save()
+
+        self.assertFalse(AvatarJob.objects.exists())
+
+    @override_settings(AVATAR_JOB_MAX_ATTEMPTS=2)
+    def test_failed_job_is_retried_then_marked_failed(self):
+        job = AvatarJob.objects.create(profile=self.profile, name='missing.png')
+
+        [job] = claim_jobs(10)
+        fail_job(job, FileNotFoundError('missing.png'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, AvatarJob.PENDING)
+        self.assertGreater(job.run_after, job.started_at)
+
+        # Retries wait for their back-off delay
+        self.assertEqual(claim_jobs(10), [])
+
+        AvatarJob.objects.filter(pk=job.pk).update(run_after=job.started_at)
+        [job] = claim_jobs(10)
+        fail_job(job, FileNotFoundError('missing.png'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, AvatarJob.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn('FileNotFoundError', job.last_error)
+
+    @override_settings(AVATAR_JOB_MAX_ATTEMPTS=2, AVATAR_JOB_TIMEOUT=60)
+    def test_jobs_of_crashed_workers_count_attempts(self):
+        job = AvatarJob.objects.create(profile=self.profile, name='crash.png')
+
+        for attempt in (1, 2):
+            [claimed] = claim_jobs(10)
+            self.assertEqual(AvatarJob.objects.get(pk=job.pk).attempts, attempt)
+            # the worker dies without reporting back
+            AvatarJob.objects.filter(pk=job.pk).update(
+                started_at=timezone.now() - timedelta(seconds=120)
+            )
+
+        self.assertEqual(claim_jobs(10), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, AvatarJob.FAILED)
+        self.assertIn('Worker stopped', job.last_error)
+
+    def test_claimed_jobs_are_not_claimed_again(self):
+        AvatarJob.objects.create(profile=self.profile, name='one.png')
+
+        self.assertEqual(len(claim_jobs(10)), 1)
+        self.assertEqual(claim_jobs(10), [])
+
+    def test_jobs_submitted_to_a_broken_pool_are_requeued(self):
+        AvatarJob.objects.create(profile=self.profile, name='one.png')
+        jobs = claim_jobs(10)
+        pool = ProcessPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        wait([pool.submit(os._exit, 1)])
+
+        worker = AvatarWorker(stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(worker.process_batch(pool, jobs))
+
+        job = AvatarJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (AvatarJob.PENDING, 0))
+
+    @override_settings(AVATAR_JOB_MAX_ATTEMPTS=2, AVATAR_JOB_RETRY_DELAY=0)
+    def test_job_that_keeps_crashing_the_pool_fails(self):
+        AvatarJob.objects.create(profile=self.profile, name='bomb.png')
+
+        # the pool forks after the patch, so its children crash too
+        stderr = StringIO()
+        with mock.patch(
+            'users.management.commands.avatar_worker.process_avatar', crash
+        ):
+            call_command(
+                'avatar_worker',
+                once=True,
+                processes=True,
+                workers=1,
+                stdout=StringIO(),
+                stderr=stderr,
+            )
+
+        job = AvatarJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (AvatarJob.FAILED, 2))
+        self.assertIn('BrokenProcessPool', job.last_error)
+        self.assertEqual(stderr.getvalue().count('Process pool broke'), 2)
@@ -0,0 +1,55 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from users.forms import UpdateProfileForm
+from users.images import AvatarTooLarge, _open_reduced, generate_variants
+
+
+def make_upload(size=(300, 200), format='PNG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format=format)
+    return SimpleUploadedFile('avatar.png', buffer.getvalue(), content_type='image/png')
+
+
+class AvatarLimitsTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @override_settings(AVATAR_MAX_UPLOAD_BYTES=100)
+    def test_form_rejects_upload_over_byte_budget(self):
+        form = UpdateProfileForm({'bio': 'bio'}, {'avatar': make_upload()})
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['avatar'][0].code, 'file_too_large')
+
+    @override_settings(AVATAR_MAX_PIXELS=1000)
+    def test_form_rejects_upload_over_pixel_budget(self):
+        form = UpdateProfileForm({'bio': 'bio'}, {'avatar': make_upload()})
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['avatar'][0].code, 'too_many_pixels')
+
+    def test_generate_variants_rejects_before_decoding(self):
+        source = f'{self.directory}/big.png'
+        Image.new('RGB', (300, 200), 'red').save(source)
+
+        with self.assertRaises(AvatarTooLarge):
+            generate_variants(source, [(100, f'{self.directory}/a-100.jpg')], max_pixels=1000)
+
+    def test_jpeg_is_decoded_at_reduced_scale(self):
+        source = f'{self.directory}/big.jpg'
+        Image.new('RGB', (4000, 3000), 'red').save(source)
+
+        with Image.open(source) as img:
+            reduced = _open_reduced(img, 100)
+
+        # DCT scaling keeps at least twice the largest variant
+        self.assertEqual(reduced.size, (500, 375))
@@ -0,0 +1,56 @@
+import os
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from users.models import variant_targets
+from users.testing import TemporaryMediaMixin, make_image
+
+
+@override_settings(
+    AVATAR_ASYNC_PROCESSING=False,
+    AVATAR_VARIANTS={'navbar': 40, 'profile': 100},
+)
+class AvatarVariantsTestCase(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.profile = self.user.profile
+
+    def test_variants_are_generated(self):
+        self.profile.avatar = make_image()
+        self.profile.save()
+
+        for size, path in variant_targets(self.profile.avatar.name):
+            with Image.open(path) as img:
+                self.assertEqual(img.size, (size, size))
+                self.assertEqual(img.format, 'JPEG')
+            with Image.open(path.replace('.jpg', '.webp')) as img:
+                self.assertEqual(img.size, (size, size))
+                self.assertEqual(img.format, 'WEBP')
+
+        self.assertTrue(self.profile.avatar_ready)
+        self.assertIn('-40.jpg 40w', self.profile.avatar_srcset)
+        self.assertIn('-100.jpg 100w', self.profile.avatar_srcset)
+
+    def test_identical_uploads_are_stored_once(self):
+        self.profile.avatar = make_image('first.png')
+        self.profile.save()
+
+        other = User.objects.create_user(username='other', password='testpass').profile
+        other.avatar = make_image('second.png')
+        other.save()
+
+        # Both profiles point at the same content-addressed file
+        self.assertEqual(self.profile.avatar.name, other.avatar.name)
+        upload_dir = os.path.join(self.media_root, 'profile_images')
+        originals = [name for name in os.listdir(upload_dir) if name.endswith('.png')]
+        self.assertEqual(len(originals), 1)
+
+    def test_pending_avatar_falls_back_to_original(self):
+        self.profile.avatar = make_image(color='blue')
+        with self.settings(AVATAR_ASYNC_PROCESSING=True):
+            self.profile.save()
+
+        self.assertEqual(self.profile.avatar_srcset, '')
+        self.assertEqual(self.profile.avatar_src, self.profile.avatar.url)
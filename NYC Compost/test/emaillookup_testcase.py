@@ -0,0 +1,92 @@
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import TestCase
+from django.urls import reverse
+
+from users.backends import EmailModelBackend
+from users.forms import RegisterForm, UpdateUserForm
+from users.models import Profile
+
+
+class EmailLookupTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', email='TestUser@Example.com', password='testpass'
+        )
+
+    def email_lower(self):
+        return Profile.objects.get(user=self.user).email_lower
+
+    def test_profile_gets_lowered_email(self):
+        self.assertEqual(self.email_lower(), 'testuser@example.com')
+
+    def test_email_change_is_copied(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.email = 'New@Example.com'
+        user.save()
+
+        self.assertEqual(self.email_lower(), 'new@example.com')
+
+    def test_email_change_through_loaded_profile(self):
+        user = User.objects.select_related('profile').get(pk=self.user.pk)
+        user.email = 'New@Example.com'
+        user.save()
+
+        self.assertEqual(self.email_lower(), 'new@example.com')
+
+    def test_update_fields_skip_profile(self):
+        user = User.objects.get(pk=self.user.pk)
+
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+
+    def test_register_rejects_taken_email(self):
+        form = RegisterForm(data={
+            'first_name': 'Test',
+            'last_name': 'User',
+            'username': 'another',
+            'email': 'testuser@EXAMPLE.com',
+            'password1': 'Complex-pass-123',
+            'password2': 'Complex-pass-123',
+        })
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['email'][0].code, 'duplicate_email')
+
+    def test_update_keeps_own_email(self):
+        form = UpdateUserForm(
+            data={'username': 'testuser', 'email': 'testuser@example.com'},
+            instance=self.user,
+        )
+
+        self.assertTrue(form.is_valid())
+
+    def test_password_reset_ignores_case(self):
+        self.client.post(reverse('password_reset'), {'email': 'TESTUSER@example.com'})
+
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_password_reset_rejects_confusable_email(self):
+        # a stale or confusable lookup key must not redirect the reset mail
+        other = User.objects.create_user(
+            username='mike', email='mıke@example.org', password='testpass'
+        )
+        Profile.objects.filter(user=other).update(email_lower='mike@example.org')
+
+        self.client.post(reverse('password_reset'), {'email': 'mike@example.org'})
+
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_email_backend(self):
+        backend = EmailModelBackend()
+
+        self.assertEqual(
+            backend.authenticate(None, username='testuser@example.COM', password='testpass'),
+            self.user,
+        )
+        self.assertIsNone(
+            backend.authenticate(None, username='testuser@example.com', password='wrong')
+        )
+        self.assertIsNone(
+            backend.authenticate(None, username='nobody@example.com', password='testpass')
+        )
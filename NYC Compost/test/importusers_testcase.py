@@ -0,0 +1,124 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
+
+from users import availability
+from users.availability import build_filter, is_taken
+from users.models import DEFAULT_AVATAR, Profile
+from users.routers import PrimaryReplicaRouter
+
+CSV = '''username,email,first_name,last_name,password,bio
+alice,Alice@Example.com,Alice,Smith,Compost-pile-1,Worm farmer
+bob,bob@example.com,Bob,,,
+carol,,,,Compost-pile-3,
+not valid,x@example.com,,,,
+alice,other@example.com,,,,
+dave,BOB@example.com,,,,
+existing,new@example.com,,,,
+'''
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportUsersTestCase(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='existing', email='existing@example.com')
+        self.addCleanup(setattr, availability, '_filter', None)
+
+    def write(self, content, suffix):
+        f = tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False)
+        self.addCleanup(os.remove, f.name)
+        with f:
+            f.write(content)
+        return f.name
+
+    def run_import(self, path, **options):
+        stdout, stderr = StringIO(), StringIO()
+        options.setdefault('workers', 0)
+        call_command('import_users', path, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_csv(self):
+        stdout, stderr = self.run_import(self.write(CSV, '.csv'), batch_size=2)
+
+        self.assertIn('Done: 3 users created, 4 skipped', stdout)
+        self.assertIn('rows/s', stdout)
+        self.assertIn('line 5:', stderr)
+        self.assertIn('line 6: duplicate username or email in the file', stderr)
+        self.assertIn('line 7: duplicate username or email in the file', stderr)
+        self.assertIn('line 8: username existing already exists', stderr)
+
+        alice = User.objects.get(username='alice')
+        self.assertEqual((alice.first_name, alice.last_name), ('Alice', 'Smith'))
+        self.assertTrue(alice.check_password('Compost-pile-1'))
+        self.assertFalse(User.objects.get(username='bob').has_usable_password())
+
+        profile = alice.profile
+        self.assertEqual(profile.bio, 'Worm farmer')
+        self.assertEqual(profile.email_lower, 'alice@example.com')
+        self.assertEqual(profile.avatar.name, DEFAULT_AVATAR)
+        self.assertEqual(Profile.objects.count(), User.objects.count())
+
+    def test_ndjson(self):
+        rows = [
+            {'username': 'alice', 'email': 'alice@example.com', 'password': 'Compost-pile-1'},
+            'not an object',
+            {'username': 'bob'},
+        ]
+        content = '\n'.join(json.dumps(row) for row in rows) + '\n{broken\n'
+
+        stdout, stderr = self.run_import(self.write(content, '.ndjson'))
+
+        self.assertIn('Done: 2 users created, 2 skipped', stdout)
+        self.assertIn('line 2: not an object', stderr)
+        self.assertIn('line 4: not JSON', stderr)
+
+    def test_existing_email_is_skipped(self):
+        path = self.write('username,email\nnewuser,EXISTING@example.com\n', '.csv')
+
+        stdout, stderr = self.run_import(path)
+
+        self.assertIn('Done: 0 users created, 1 skipped', stdout)
+        self.assertIn('email EXISTING@example.com already exists', stderr)
+
+    def test_no_signals_per_row(self):
+        received = []
+        post_save.connect(lambda **kwargs: received.append(kwargs), sender=User, dispatch_uid='test')
+        self.addCleanup(post_save.disconnect, sender=User, dispatch_uid='test')
+
+        self.run_import(self.write(CSV, '.csv'))
+
+        self.assertEqual(received, [])
+
+    def test_availability_filter_is_updated(self):
+        build_filter()
+
+        self.run_import(self.write(CSV, '.csv'))
+
+        self.assertTrue(is_taken('username', 'carol'))
+        self.assertTrue(is_taken('email', 'alice@example.com'))
+
+    @override_settings(DATABASE_REPLICAS=['replica0'])
+    def test_reads_stay_on_primary(self):
+        # reads outside the test's transaction would go to the replica, which
+        # this test case is not allowed to query
+        with mock.patch.object(PrimaryReplicaRouter, 'in_transaction', return_value=False):
+            stdout, _ = self.run_import(self.write(CSV, '.csv'), batch_size=2)
+
+        self.assertIn('Done: 3 users created, 4 skipped', stdout)
+
+    def test_process_pool(self):
+        self.run_import(self.write(CSV, '.csv'), workers=2)
+
+        self.assertTrue(User.objects.get(username='alice').check_password('Compost-pile-1'))
+
+    def test_missing_username_column(self):
+        with self.assertRaisesMessage(CommandError, 'no username column'):
+            self.run_import(self.write('email\nx@example.com\n', '.csv'))
@@ -0,0 +1,56 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from users.last_login import flush_last_logins
+
+
+def last_login_updates(queries):
+    return [
+        query for query in queries
+        if query['sql'].startswith('UPDATE') and 'last_login' in query['sql']
+    ]
+
+
+@override_settings(LAST_LOGIN_BUFFERED=True, LAST_LOGIN_BATCH_SIZE=3)
+class LastLoginTestCase(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username='user%d' % i, password='testpass')
+            for i in range(3)
+        ]
+        flush_last_logins()
+
+    def tearDown(self):
+        flush_last_logins()
+
+    def test_buffered_login_skips_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.login(username='user0', password='testpass')
+
+        self.assertEqual(last_login_updates(queries.captured_queries), [])
+        self.assertIsNone(User.objects.get(username='user0').last_login)
+
+    def test_flush_writes_in_one_update(self):
+        self.client.login(username='user0', password='testpass')
+        self.client.login(username='user1', password='testpass')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(flush_last_logins(), 2)
+
+        self.assertEqual(len(last_login_updates(queries.captured_queries)), 1)
+        self.assertEqual(User.objects.filter(last_login__isnull=False).count(), 2)
+        self.assertEqual(flush_last_logins(), 0)
+
+    def test_batch_size_triggers_flush(self):
+        for user in self.users:
+            self.client.login(username=user.username, password='testpass')
+
+        self.assertEqual(User.objects.filter(last_login__isnull=False).count(), 3)
+
+    @override_settings(LAST_LOGIN_BUFFERED=False)
+    def test_unbuffered_login_updates(self):
+        self.client.login(username='user0', password='testpass')
+
+        self.assertIsNotNone(User.objects.get(username='user0').last_login)
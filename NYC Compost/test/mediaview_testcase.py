@@ -0,0 +1,113 @@
+import os
+
+from django.test import TestCase, override_settings
+
+from users.testing import TemporaryMediaMixin
+
+HASHED_NAME = 'a' * 64 + '.jpg'
+VARIANT_NAME = 'a' * 64 + '-100.jpg'
+
+
+def write(path, content):
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+@override_settings(MEDIA_SENDFILE_HEADER=None)
+class MediaViewTestCase(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(cls.media_root, 'profile_images', 'variants'))
+        for name in (HASHED_NAME, 'legacy.jpg'):
+            with open(os.path.join(cls.media_root, 'profile_images', name), 'wb') as f:
+                f.write(b'0123456789')
+        # The WebP copy is the smaller one
+        for name, content in ((VARIANT_NAME, b'jpeg-bytes'), (VARIANT_NAME[:-4] + '.webp', b'webp')):
+            with open(os.path.join(cls.media_root, 'profile_images', 'variants', name), 'wb') as f:
+                f.write(content)
+
+    def test_hashed_file_is_immutable(self):
+        response = self.client.get(f'/media/profile_images/{HASHED_NAME}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['ETag'], '"%s"' % HASHED_NAME)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+    def test_variant_format_is_negotiated(self):
+        url = f'/media/profile_images/variants/{VARIANT_NAME}'
+
+        response = self.client.get(url, HTTP_ACCEPT='image/avif,image/webp,*/*')
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['Vary'], 'Accept')
+        webp_etag = response['ETag']
+
+        response = self.client.get(url, HTTP_ACCEPT='image/webp;q=0,*/*')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Vary'], 'Accept')
+        self.assertNotEqual(response['ETag'], webp_etag)
+
+    def test_regenerated_variant_is_revalidated(self):
+        url = f'/media/profile_images/variants/{VARIANT_NAME}'
+        path = os.path.join(self.media_root, 'profile_images', 'variants', VARIANT_NAME)
+        response = self.client.get(url)
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+        # reprocess_avatars --force writes new bytes under the same name
+        write(path, b'new-jpeg-bytes')
+        self.addCleanup(write, path, b'jpeg-bytes')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'new-jpeg-bytes')
+
+    def test_unhashed_file_is_revalidated(self):
+        response = self.client.get('/media/profile_images/legacy.jpg')
+
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertTrue(response['ETag'].startswith('"'))
+
+        # A matching ETag is answered with 304 and no body
+        response = self.client.get(
+            '/media/profile_images/legacy.jpg', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_range_request(self):
+        response = self.client.get(
+            '/media/profile_images/legacy.jpg', HTTP_RANGE='bytes=2-5'
+        )
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+
+        response = self.client.get(
+            '/media/profile_images/legacy.jpg', HTTP_RANGE='bytes=-3'
+        )
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(
+            '/media/profile_images/legacy.jpg', HTTP_RANGE='bytes=20-30'
+        )
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    @override_settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect')
+    def test_sendfile_handoff(self):
+        response = self.client.get('/media/profile_images/legacy.jpg')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/profile_images/legacy.jpg'
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_missing_and_traversal_paths_are_not_found(self):
+        self.assertEqual(self.client.get('/media/missing.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
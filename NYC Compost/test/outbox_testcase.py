@@ -0,0 +1,147 @@
+import shutil
+import socket
+import tempfile
+import time
+import unittest
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from users import prometheus
+from users.mail import OutboxEmailBackend, claim, outbox_stats
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return '250 OK'
+
+
+class OutboxTestCase(TestCase):
+    def setUp(self):
+        self.outbox_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            EMAIL_OUTBOX_DIR=self.outbox_dir,
+            EMAIL_OUTBOX_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.outbox_dir, ignore_errors=True)
+
+    def spool(self, count):
+        messages = [
+            EmailMessage(f'Subject {i}', 'Body', 'from@example.com', ['to@example.com'])
+            for i in range(count)
+        ]
+        OutboxEmailBackend().send_messages(messages)
+
+    def test_messages_are_spooled_not_sent(self):
+        self.spool(3)
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(outbox_stats()['queue_depth'], 3)
+
+    def test_worker_drains_outbox(self):
+        self.spool(5)
+
+        out = StringIO()
+        call_command('send_queued_mail', once=True, batch_size=2, stdout=out)
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(
+            sorted(message.subject for message in mail.outbox),
+            [f'Subject {i}' for i in range(5)],
+        )
+        self.assertEqual(outbox_stats()['queue_depth'], 0)
+        self.assertIn('delivery latency', out.getvalue())
+
+    @override_settings(
+        EMAIL_OUTBOX_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_HOST='127.0.0.1',
+        EMAIL_PORT=1,
+        EMAIL_USE_TLS=False,
+        EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+        EMAIL_OUTBOX_RETRY_DELAY=0,
+    )
+    def test_failed_delivery_is_retried_then_set_aside(self):
+        self.spool(1)
+
+        call_command('send_queued_mail', once=True, stdout=StringIO())
+
+        stats = outbox_stats()
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['failed'], 1)
+
+    @override_settings(
+        EMAIL_OUTBOX_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_HOST='127.0.0.1',
+        EMAIL_PORT=1,
+        EMAIL_USE_TLS=False,
+        EMAIL_OUTBOX_RETRY_DELAY=60,
+    )
+    def test_failed_delivery_waits_before_retrying(self):
+        self.spool(1)
+
+        call_command('send_queued_mail', once=True, stdout=StringIO())
+
+        stats = outbox_stats()
+        self.assertEqual(stats['queue_depth'], 1)
+        self.assertEqual(stats['waiting_retry'], 1)
+        self.assertEqual(claim(10), [])
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.assertEqual(len(claim(10)), 1)
+
+    def test_metrics(self):
+        self.spool(2)
+        with override_settings(METRICS_ENABLED=True, METRICS_DIR=None):
+            prometheus._store_pid = None
+            self.addCleanup(setattr, prometheus, '_store_pid', None)
+            self.assertIn('email_outbox_queue_depth 2', prometheus.exposition().splitlines())
+
+            call_command('send_queued_mail', once=True, stdout=StringIO())
+            lines = prometheus.exposition().splitlines()
+
+        self.assertIn('email_outbox_queue_depth 0', lines)
+        self.assertIn('email_delivery_latency_seconds_count 2', lines)
+
+    @unittest.skipIf(Controller is None, 'aiosmtpd is not installed')
+    def test_delivery_over_smtp(self):
+        handler = RecordingHandler()
+        port = free_port()
+        controller = Controller(handler, hostname='127.0.0.1', port=port)
+        controller.start()
+        self.addCleanup(controller.stop)
+
+        self.spool(4)
+        with self.settings(
+            EMAIL_OUTBOX_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=port,
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+        ):
+            call_command('send_queued_mail', once=True, connections=2, stdout=StringIO())
+
+        self.assertEqual(len(handler.messages), 4)
+        self.assertEqual(outbox_stats()['queue_depth'], 0)
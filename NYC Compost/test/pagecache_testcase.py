@@ -0,0 +1,117 @@
+import os
+import re
+
+from django.contrib.auth.models import User
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from users import page_cache, prometheus
+from users.page_cache import clear_page_cache, template_version
+from users.template_cache import TEMPLATE_DIR
+
+
+def csrf_token(response):
+    return re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()).group(1)
+
+
+class PageCacheTestCase(TestCase):
+    def setUp(self):
+        clear_page_cache()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+
+    def test_anonymous_pages_are_cached(self):
+        for name in ('users-home', 'login', 'users-register', 'password_reset'):
+            first = self.client.get(reverse(name))
+            self.assertEqual(first['X-Page-Cache'], 'miss')
+
+            with self.assertNumQueries(0):
+                second = self.client.get(reverse(name))
+            self.assertEqual(second['X-Page-Cache'], 'hit')
+            self.assertEqual(second.status_code, 200)
+            self.assertTrue(second['Content-Type'].startswith('text/html'))
+
+    def test_query_string_is_part_of_the_key(self):
+        self.client.get(reverse('login'))
+        response = self.client.get(reverse('login') + '?next=/profile/')
+
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        response = self.client.get(reverse('login') + '?next=/profile/')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    def test_cached_pages_get_a_working_csrf_token(self):
+        Client().get(reverse('login'))
+
+        client = Client(enforce_csrf_checks=True)
+        response = client.get(reverse('login'))
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertIn('csrftoken', response.cookies)
+        self.assertNotIn(page_cache.CSRF_PLACEHOLDER.decode(), response.content.decode())
+
+        response = client.post(reverse('login'), {
+            'username': 'testuser',
+            'password': 'testpass',
+            'csrfmiddlewaretoken': csrf_token(response),
+        })
+        self.assertRedirects(response, reverse('users-home'), fetch_redirect_response=False)
+
+    def test_authenticated_users_bypass_the_cache(self):
+        self.client.get(reverse('users-home'))
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('users-home'))
+
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertContains(response, 'Logout')
+
+    def test_flash_messages_bypass_the_cache(self):
+        self.client.get(reverse('login'))
+        self.client.post(reverse('users-register'), {
+            'first_name': 'New',
+            'last_name': 'User',
+            'username': 'newuser',
+            'email': 'newuser@example.com',
+            'password1': 'Complex-pass-123',
+            'password2': 'Complex-pass-123',
+        })
+
+        response = self.client.get(reverse('login'))
+
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertContains(response, 'Account created for newuser')
+
+    @override_settings(PAGE_CACHE_VIEWS=[])
+    def test_disabled(self):
+        self.client.get(reverse('users-home'))
+
+        self.assertNotIn('X-Page-Cache', self.client.get(reverse('users-home')))
+
+    def test_deploy_invalidates(self):
+        with override_settings(DEPLOY_ID='one'):
+            self.client.get(reverse('users-home'))
+            self.assertEqual(self.client.get(reverse('users-home'))['X-Page-Cache'], 'hit')
+        with override_settings(DEPLOY_ID='two'):
+            self.assertEqual(self.client.get(reverse('users-home'))['X-Page-Cache'], 'miss')
+
+    def test_template_change_invalidates(self):
+        path = os.path.join(TEMPLATE_DIR, 'users', 'home.html')
+        stat = os.stat(path)
+        self.addCleanup(os.utime, path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        page_cache._version = (0, None)
+        before = template_version()
+
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        page_cache._version = (0, None)
+
+        self.assertNotEqual(template_version(), before)
+
+    def test_hit_ratio_metric(self):
+        with override_settings(METRICS_ENABLED=True, METRICS_DIR=None):
+            prometheus._store_pid = None
+            self.addCleanup(setattr, prometheus, '_store_pid', None)
+            self.client.get(reverse('users-home'))
+            self.client.get(reverse('users-home'))
+            self.client.get(reverse('users-home'))
+            lines = prometheus.exposition().splitlines()
+
+        self.assertIn('page_cache_requests_total{result="hit",view="users-home"} 2', lines)
+        self.assertIn('page_cache_requests_total{result="miss",view="users-home"} 1', lines)
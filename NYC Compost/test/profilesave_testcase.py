@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from users import images
+from users.models import AvatarJob
+from users.testing import TemporaryMediaMixin, make_image
+
+
+@override_settings(AVATAR_ASYNC_PROCESSING=False)
+class ProfileSaveTestCase(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.profile = self.user.profile
+
+    def test_login_does_not_touch_profile(self):
+        with mock.patch.object(images.Image, 'open', wraps=Image.open) as image_open:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    reverse('login'),
+                    {'username': 'testuser', 'password': 'testpass'},
+                )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(image_open.call_count, 0)
+        profile_queries = [q['sql'] for q in queries if 'users_profile' in q['sql']]
+        self.assertEqual(profile_queries, [])
+
+    def test_unchanged_profile_is_not_saved_by_signal(self):
+        self.profile.refresh_from_db()
+        self.user.first_name = 'Test'
+
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save()
+
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "users_profile"')]
+        self.assertEqual(updates, [])
+
+    def test_changed_profile_is_saved_by_signal(self):
+        self.profile.bio = 'New bio'
+        self.user.save()
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.bio, 'New bio')
+
+    def test_image_is_only_processed_when_avatar_changes(self):
+        with mock.patch.object(images.Image, 'open', wraps=Image.open) as image_open:
+            self.profile.bio = 'Only the bio changed'
+            self.profile.save()
+            self.assertEqual(image_open.call_count, 0)
+
+            self.profile.avatar = make_image()
+            self.profile.save()
+            self.assertEqual(image_open.call_count, 1)
+
+            self.profile.save()
+            self.assertEqual(image_open.call_count, 1)
+
+    @override_settings(AVATAR_ASYNC_PROCESSING=True)
+    def test_unchanged_avatar_is_not_queued_again(self):
+        self.profile.avatar = make_image()
+        self.profile.save()
+        AvatarJob.objects.update(status=AvatarJob.DONE)
+
+        self.profile.bio = 'Only the bio changed'
+        self.profile.save()
+
+        self.assertEqual(AvatarJob.objects.count(), 1)
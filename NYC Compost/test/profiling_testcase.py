@@ -0,0 +1,69 @@
+import glob
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+class ProfilingTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(PROFILE_DIR=self.directory, PROFILE_TOKEN='secret')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def profiles(self, view_name):
+        return glob.glob(os.path.join(self.directory, view_name, '*.prof.gz'))
+
+    def test_not_sampled(self):
+        self.client.get(reverse('users-home'))
+
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_not_sampled_skips_url_resolution(self):
+        with mock.patch('users.profiling.resolve') as resolve:
+            self.client.get(reverse('users-home'))
+
+        resolve.assert_not_called()
+
+    @override_settings(PROFILE_VIEW_RATES={'users-home': 1})
+    def test_view_rate(self):
+        self.client.get(reverse('users-home'))
+        self.client.get(reverse('login'))
+
+        self.assertEqual(len(self.profiles('users-home')), 1)
+        self.assertEqual(self.profiles('login'), [])
+
+    def test_header_token(self):
+        self.client.get(reverse('users-home'), HTTP_X_PROFILE='wrong')
+        self.client.get(reverse('users-home'), HTTP_X_PROFILE='secret')
+
+        self.assertEqual(len(self.profiles('users-home')), 1)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1, PROFILE_KEEP=2)
+    def test_rotation(self):
+        for _ in range(3):
+            self.client.get(reverse('users-home'))
+
+        self.assertEqual(len(self.profiles('users-home')), 2)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_report(self):
+        self.client.get(reverse('users-home'))
+        self.client.get(reverse('users-home'))
+        out = StringIO()
+
+        call_command('profile_report', 'users-home', '--limit', '5', stdout=out)
+
+        self.assertIn('users-home: 2 profiles', out.getvalue())
+        self.assertIn('function calls', out.getvalue())
+
+    def test_report_without_profiles(self):
+        with self.assertRaises(CommandError):
+            call_command('profile_report', stdout=StringIO())
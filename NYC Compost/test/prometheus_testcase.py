@@ -0,0 +1,83 @@
+import multiprocessing
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from users import prometheus
+
+
+def observe_in_child():
+    prometheus.REQUEST_DURATION.observe(0.2, view='child')
+    prometheus.REQUESTS.inc(view='child', method='GET', status='200')
+
+
+class PrometheusTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(METRICS_ENABLED=True, METRICS_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # start every test with a fresh store
+        prometheus._store_pid = None
+        self.addCleanup(setattr, prometheus, '_store_pid', None)
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], prometheus.CONTENT_TYPE)
+        return response.content.decode().splitlines()
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+    def test_request_metrics(self):
+        self.client.get(reverse('users-home'))
+        self.client.get(reverse('users-home'))
+        lines = self.scrape()
+
+        self.assertIn(
+            'http_requests_total{method="GET",status="200",view="users-home"} 2', lines
+        )
+        self.assertIn('http_request_duration_seconds_bucket{view="users-home",le="+Inf"} 2', lines)
+        self.assertIn('http_request_duration_seconds_count{view="users-home"} 2', lines)
+
+    def test_buckets_are_cumulative(self):
+        prometheus.REQUEST_DURATION.observe(0.003, view='test')
+        prometheus.REQUEST_DURATION.observe(0.3, view='test')
+        lines = self.scrape()
+
+        self.assertIn('http_request_duration_seconds_bucket{view="test",le="0.005"} 1', lines)
+        self.assertIn('http_request_duration_seconds_bucket{view="test",le="0.25"} 1', lines)
+        self.assertIn('http_request_duration_seconds_bucket{view="test",le="0.5"} 2', lines)
+        self.assertIn('http_request_duration_seconds_sum{view="test"} 0.303', lines)
+
+    def test_session_and_query_metrics(self):
+        User.objects.create_user(username='testuser', password='testpass')
+        self.client.post(reverse('login'), {'username': 'testuser', 'password': 'testpass'})
+        self.client.get(reverse('users-profile'))
+        text = '\n'.join(self.scrape())
+
+        self.assertIn('session_store_seconds_count{operation="load"}', text)
+        self.assertIn('session_store_seconds_count{operation="save"}', text)
+        self.assertIn('db_query_duration_seconds_count{alias="default"}', text)
+
+    def test_processes_share_directory(self):
+        prometheus.REQUESTS.inc(view='child', method='GET', status='200')
+
+        process = multiprocessing.get_context('fork').Process(target=observe_in_child)
+        process.start()
+        process.join()
+        lines = self.scrape()
+
+        self.assertIn('http_requests_total{method="GET",status="200",view="child"} 2', lines)
+        self.assertIn('http_request_duration_seconds_count{view="child"} 1', lines)
+
+    def test_store_grows(self):
+        for i in range(2000):
+            prometheus.REQUESTS.inc(view='view%d' % i, method='GET', status='200')
+
+        lines = self.scrape()
+        self.assertIn('http_requests_total{method="GET",status="200",view="view1999"} 1', lines)
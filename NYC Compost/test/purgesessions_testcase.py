@@ -0,0 +1,62 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from users.sessions.purge import purge_expired_sessions
+
+
+@override_settings(SESSION_ENGINE='users.sessions.db')
+class PurgeSessionsTestCase(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [
+                Session(
+                    session_key=f'expired{i:03}',
+                    session_data='',
+                    expire_date=now - timedelta(days=1),
+                )
+                for i in range(25)
+            ]
+            + [
+                Session(
+                    session_key=f'live{i:03}',
+                    session_data='',
+                    expire_date=now + timedelta(days=1),
+                )
+                for i in range(5)
+            ]
+        )
+
+    def test_purge_deletes_expired_sessions_in_batches(self):
+        # Three batches of at most ten sessions each
+        with self.assertNumQueries(6):
+            deleted = purge_expired_sessions(batch_size=10, pause=0)
+
+        self.assertEqual(deleted, 25)
+        self.assertEqual(Session.objects.count(), 5)
+        self.assertFalse(Session.objects.filter(session_key__startswith='expired').exists())
+
+    def test_purge_stops_at_time_budget(self):
+        deleted = purge_expired_sessions(batch_size=10, pause=0, time_budget=1e-9)
+
+        self.assertEqual(deleted, 10)
+        self.assertEqual(Session.objects.count(), 20)
+
+    def test_purge_sessions_command(self):
+        out = StringIO()
+        call_command('purge_sessions', batch_size=7, pause=0, stdout=out)
+
+        self.assertIn('Deleted 25 expired sessions', out.getvalue())
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_purge_sessions_command_without_database_sessions(self):
+        out = StringIO()
+        call_command('purge_sessions', stdout=out)
+
+        self.assertIn('no sessions in the database', out.getvalue())
+        self.assertEqual(Session.objects.count(), 30)
@@ -0,0 +1,133 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.routers import (
+    PrimaryReplicaRouter,
+    ReplicaPinningMiddleware,
+    pinned,
+    use_primary,
+)
+
+
+@override_settings(DATABASE_REPLICAS=['replica0'])
+class ReplicaRoutingTestCase(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.seen = []
+
+    def view(self, request):
+        self.seen.append(pinned())
+        return HttpResponse()
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.router.db_for_read(User), 'replica0')
+        self.assertEqual(self.router.db_for_write(User), 'default')
+
+    def test_pinned_reads_go_to_primary(self):
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertEqual(self.router.db_for_read(User), 'replica0')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'users'))
+        self.assertFalse(self.router.allow_migrate('replica0', 'users'))
+
+    def test_post_pins_following_reads(self):
+        middleware = ReplicaPinningMiddleware(self.view)
+
+        response = middleware(self.factory.post('/profile/'))
+        self.assertIn('pin_primary', response.cookies)
+
+        middleware(self.factory.get('/profile/'))
+        self.factory.cookies['pin_primary'] = '1'
+        middleware(self.factory.get('/profile/'))
+
+        self.assertEqual(self.seen, [True, False, True])
+        self.assertFalse(pinned())
+
+    def test_failed_post_does_not_pin(self):
+        middleware = ReplicaPinningMiddleware(lambda request: HttpResponse(status=400))
+
+        response = middleware(self.factory.post('/profile/'))
+
+        self.assertNotIn('pin_primary', response.cookies)
+
+
+# the test runner points a MIRROR alias at the default test database, so a
+# replica is added here when SQLITE_REPLICAS did not configure one
+if 'replica0' not in connections.databases:
+    connections.databases['replica0'] = {
+        **connections.databases['default'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+
+@override_settings(DATABASE_REPLICAS=['replica0'])
+class ReplicaQueriesTestCase(TestCase):
+    databases = {'default', 'replica0'}
+
+    def setUp(self):
+        # a real replica would have caught up with the test's own writes
+        replica = connections['replica0']
+        replica.ensure_connection()
+        replica.connection.execute('PRAGMA read_uncommitted = 1')
+        self.addCleanup(replica.close)
+
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_login(self.user)
+
+        # the transaction every test runs in is not one the views opened
+        depth = len(connections['default'].savepoint_ids)
+        patcher = mock.patch.object(
+            PrimaryReplicaRouter,
+            'in_transaction',
+            lambda router: len(connections['default'].savepoint_ids) > depth,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, method, *args, **kwargs):
+        with CaptureQueriesContext(connections['default']) as primary:
+            with CaptureQueriesContext(connections['replica0']) as replica:
+                response = getattr(self.client, method)(*args, **kwargs)
+        return response, primary.captured_queries, replica.captured_queries
+
+    def test_get_reads_from_replica(self):
+        response, primary, replica = self.request('get', reverse('users-profile'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica)
+        self.assertEqual(primary, [])
+
+    def test_pinned_get_reads_from_primary(self):
+        self.client.cookies['pin_primary'] = '1'
+
+        response, primary, replica = self.request('get', reverse('users-profile'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(primary)
+        self.assertEqual(replica, [])
+
+    def test_post_uses_primary(self):
+        response, primary, replica = self.request(
+            'post',
+            reverse('users-profile'),
+            {'username': 'renamed', 'email': 'renamed@example.com', 'bio': 'Worm farmer'},
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('pin_primary', response.cookies)
+        self.assertTrue(any(query['sql'].startswith('UPDATE') for query in primary))
+        self.assertEqual(replica, [])
+        self.assertEqual(User.objects.get(pk=self.user.pk).username, 'renamed')
@@ -0,0 +1,137 @@
+import json
+import os
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from users.management.commands.reprocess_avatars import Command
+from users.models import Profile, avatar_storage, variant_targets
+from users.testing import TemporaryMediaMixin, make_image
+
+@override_settings(AVATAR_ASYNC_PROCESSING=True)
+class ReprocessAvatarsTestCase(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        self.checkpoint = os.path.join(self.media_root, 'checkpoint.json')
+        self.profiles = []
+        for i, color in enumerate(['red', 'green', 'blue']):
+            profile = User.objects.create_user(username=f'user{i}', password='pass').profile
+            profile.avatar = make_image(color=color)
+            profile.save()
+            profile.refresh_from_db()
+            self.profiles.append(profile)
+
+    def reprocess(self, **options):
+        stdout = StringIO()
+        options.setdefault('workers', 0)
+        call_command(
+            'reprocess_avatars',
+            chunk_size=2,
+            checkpoint=self.checkpoint,
+            stdout=stdout,
+            stderr=StringIO(),
+            **options
+        )
+        return stdout.getvalue()
+
+    def break_avatar(self, profile):
+        name = avatar_storage.save('broken.png', ContentFile(b'not an image'))
+        self.addCleanup(avatar_storage.delete, name)
+        Profile.objects.filter(pk=profile.pk).update(avatar=name)
+
+    def test_reprocess_generates_variants(self):
+        stdout = self.reprocess()
+
+        for profile in self.profiles:
+            profile.refresh_from_db()
+            self.assertTrue(profile.avatar_ready)
+            for _, path in variant_targets(profile.avatar.name):
+                self.assertTrue(os.path.exists(path))
+
+        self.assertIn('Done: 3 avatars processed, 0 failed', stdout)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_reprocess_resumes_after_checkpoint(self):
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'last_pk': self.profiles[1].pk, 'processed': 2, 'failed': 0}, f)
+
+        self.reprocess()
+
+        ready = list(Profile.objects.filter(avatar_ready=True))
+        self.assertEqual(ready, [self.profiles[2]])
+
+    def test_failed_profiles_are_retried(self):
+        with open(self.checkpoint, 'w') as f:
+            json.dump(
+                {
+                    'last_pk': self.profiles[-1].pk,
+                    'processed': 2,
+                    'failed': 1,
+                    'failed_pks': [self.profiles[0].pk],
+                },
+                f,
+            )
+
+        stdout = self.reprocess()
+
+        self.assertIn('Done: 3 avatars processed, 1 failed', stdout)
+        ready = list(Profile.objects.filter(avatar_ready=True))
+        self.assertEqual(ready, [self.profiles[0]])
+
+    def test_failed_pks_are_checkpointed(self):
+        self.break_avatar(self.profiles[0])
+        checkpoints = []
+        save = Command.save_checkpoint
+
+        def save_checkpoint(command, state):
+            checkpoints.append(json.loads(json.dumps(state)))
+            save(command, state)
+
+        with mock.patch.object(Command, 'save_checkpoint', save_checkpoint):
+            stdout = self.reprocess()
+
+        self.assertIn('Done: 2 avatars processed, 1 failed', stdout)
+        self.assertEqual(checkpoints[-1]['failed_pks'], [self.profiles[0].pk])
+
+    def test_force_replaces_variants_in_place(self):
+        self.reprocess()
+        path = variant_targets(self.profiles[0].avatar.name)[0][1]
+        os.utime(path, (0, 0))
+        removed = []
+        remove = os.remove
+
+        def record_remove(name, *args, **kwargs):
+            removed.append(name)
+            remove(name, *args, **kwargs)
+
+        with mock.patch('os.remove', record_remove):
+            self.reprocess(force=True)
+
+        self.assertTrue(os.path.exists(path))
+        self.assertGreater(os.path.getmtime(path), 0)
+        self.assertEqual(removed, [self.checkpoint])
+
+    def test_broken_pool_is_restarted(self):
+        self.reprocess(workers=1)
+        for profile in self.profiles:
+            for _, path in variant_targets(profile.avatar.name):
+                os.remove(path)
+        Profile.objects.update(avatar_ready=False)
+        crashes = iter([True])
+        original = Command.run_pool
+
+        def run_pool(command, args):
+            if next(crashes, False):
+                command.pool.submit(os._exit, 1).exception()
+            return original(command, args)
+
+        with mock.patch.object(Command, 'run_pool', side_effect=run_pool, autospec=True):
+            stdout = self.reprocess(workers=1)
+
+        self.assertIn('Done: 3 avatars processed, 0 failed', stdout)
+        for profile in self.profiles:
+            for _, path in variant_targets(profile.avatar.name):
+                self.assertTrue(os.path.exists(path))
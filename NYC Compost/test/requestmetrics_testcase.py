@@ -0,0 +1,78 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from users.metrics import reset_view_stats, view_stats
+from users.page_cache import clear_page_cache
+from users.testing import RequestBudgetMixin
+
+
+class RequestMetricsTestCase(RequestBudgetMixin, TestCase):
+    def setUp(self):
+        reset_view_stats()
+        clear_page_cache()
+        self.user = User.objects.create_user(
+            username='testuser', email='testuser@example.com', password='testpass'
+        )
+
+    def test_flows_within_budget(self):
+        self.client.post(reverse('users-register'), {
+            'first_name': 'New',
+            'last_name': 'User',
+            'username': 'newuser',
+            'email': 'newuser@example.com',
+            'password1': 'Complex-pass-123',
+            'password2': 'Complex-pass-123',
+        })
+        self.client.post(reverse('login'), {'username': 'testuser', 'password': 'testpass'})
+        self.client.get(reverse('users-home'))
+        self.client.get(reverse('users-profile'))
+        self.client.post(reverse('users-profile'), {
+            'username': 'testuser',
+            'email': 'testuser@example.com',
+            'bio': 'Updated bio',
+        })
+
+    def test_sample_fields(self):
+        response = self.client.get(reverse('users-home'))
+        sample = response.request_metrics
+
+        self.assertEqual(sample['view'], 'users-home')
+        self.assertEqual(sample['queries'], 0)
+        self.assertGreater(sample['template_ms'], 0)
+        self.assertGreaterEqual(sample['total_ms'], sample['template_ms'])
+
+    @override_settings(REQUEST_BUDGETS={'users-home': {'queries': 1}})
+    def test_over_budget_fails(self):
+        self.client.force_login(self.user)
+
+        with self.assertLogs('users.metrics', 'WARNING') as logs:
+            with self.assertRaisesMessage(AssertionError, 'queries 2 > 1'):
+                self.client.get(reverse('users-home'))
+
+        self.assertEqual(json.loads(logs.records[0].getMessage())['over_budget'], ['queries'])
+
+    def test_log_line(self):
+        with self.assertLogs('users.metrics', 'INFO') as logs:
+            self.client.get(reverse('users-home'))
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['view'], 'users-home')
+        self.assertEqual(line['status'], 200)
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('users-home'))
+        self.client.get(reverse('users-home'))
+        self.assertEqual(view_stats()['users-home']['requests'], 2)
+
+        response = self.client.get(reverse('view-metrics'))
+        self.assertEqual(response.status_code, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('view-metrics'))
+
+        self.assertEqual(response.json()['users-home']['requests'], 2)
@@ -0,0 +1,71 @@
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.sessions.cached_db import SessionStore as CachedSessionStore
+from users.sessions.db import SessionStore
+
+
+def session_writes(queries):
+    return [
+        q['sql']
+        for q in queries
+        if 'django_session' in q['sql'] and not q['sql'].startswith('SELECT')
+    ]
+
+
+@override_settings(SESSION_ENGINE='users.sessions.db')
+class SessionWriteTestCase(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='testuser', password='testpass')
+
+    def test_login_writes_session_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('login'),
+                {'username': 'testuser', 'password': 'testpass', 'remember_me': True},
+            )
+
+        self.assertEqual(response.status_code, 302)
+        writes = session_writes(queries)
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0].startswith('INSERT'))
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_login_without_remember_me_expires_at_browser_close(self):
+        self.client.post(
+            reverse('login'), {'username': 'testuser', 'password': 'testpass'}
+        )
+
+        self.assertTrue(self.client.session.get_expire_at_browser_close())
+
+    def test_unchanged_session_is_not_written(self):
+        session = SessionStore()
+        session['key'] = 'value'
+        session.save()
+
+        session = SessionStore(session.session_key)
+        session['key'] = 'value'
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+        self.assertEqual(session_writes(queries), [])
+
+        session['key'] = 'changed'
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+        self.assertEqual(len(session_writes(queries)), 1)
+        self.assertEqual(SessionStore(session.session_key)['key'], 'changed')
+
+
+@override_settings(SESSION_ENGINE='users.sessions.cached_db')
+class CachedSessionTestCase(TestCase):
+    def test_cached_session_is_read_without_queries(self):
+        session = CachedSessionStore()
+        session['key'] = 'value'
+        session.save()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(CachedSessionStore(session.session_key)['key'], 'value')
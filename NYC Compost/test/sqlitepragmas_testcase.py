@@ -0,0 +1,15 @@
+from django.db import connection
+from django.test import TestCase
+
+
+class SQLitePragmasTestCase(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA %s' % name)
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        # 1 is NORMAL
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -16000)
@@ -0,0 +1,157 @@
+import gzip
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from users import assets
+from users.management.commands.vendor_static import integrity
+from users.wsgi_static import IMMUTABLE, SHORT, StaticFiles
+
+
+class VendorAssetTestCase(SimpleTestCase):
+    def setUp(self):
+        assets._vendored.clear()
+        self.addCleanup(assets._vendored.clear)
+
+    def render(self, name):
+        return Template('{% load assets %}{% vendor_asset name %}').render(
+            Context({'name': name})
+        )
+
+    def test_vendored_asset_is_served_locally(self):
+        html = self.render('bootstrap.css')
+
+        self.assertIn('href="/static/vendor/bootstrap-4.0.0/css/bootstrap.min.css"', html)
+        self.assertNotIn('integrity', html)
+
+    def test_every_asset_is_vendored_and_pinned(self):
+        for name, asset in assets.VENDOR_ASSETS.items():
+            with self.subTest(name):
+                self.assertTrue(assets.is_vendored(name))
+                path = finders.find(asset['path'])
+                with open(path, 'rb') as f:
+                    self.assertEqual(integrity(f.read()), asset['integrity'])
+
+    def test_missing_asset_falls_back_to_cdn(self):
+        with mock.patch('users.assets.finders.find', return_value=None):
+            html = self.render('jquery.js')
+
+        self.assertIn('src="https://code.jquery.com/jquery-3.2.1.min.js"', html)
+        self.assertIn(assets.VENDOR_ASSETS['jquery.js']['integrity'], html)
+        self.assertIn('crossorigin="anonymous"', html)
+
+
+class CompressedStorageTestCase(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings = override_settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_STORAGE='users.storage.CompressedManifestStaticFilesStorage',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_collectstatic_writes_compressed_copies(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+        name = staticfiles_storage.stored_name('vendor/bootstrap-4.0.0/css/bootstrap.min.css')
+        self.assertRegex(name, r'\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.root, name)
+        with open(path, 'rb') as f:
+            original = f.read()
+        with open(path + '.gz', 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), original)
+        self.assertLess(os.path.getsize(path + '.gz'), len(original))
+        # images are already compressed
+        self.assertFalse(
+            any(n.endswith('.png.gz') for _, _, files in os.walk(self.root) for n in files)
+        )
+
+
+class StaticFilesTestCase(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        for name, content in (
+            ('app.0123456789ab.css', b'body {}'),
+            ('app.0123456789ab.css.gz', b'gzip'),
+            ('app.0123456789ab.css.br', b'br'),
+            ('app.css', b'body {}'),
+        ):
+            with open(os.path.join(self.root, name), 'wb') as f:
+                f.write(content)
+        self.static_files = StaticFiles(self.application, self.root, '/static/')
+
+    def application(self, environ, start_response):
+        start_response('200 OK', [])
+        return [b'from django']
+
+    def request(self, path, method='GET', **headers):
+        environ = {'PATH_INFO': path, 'REQUEST_METHOD': method, **headers}
+        start_response = mock.Mock()
+        body = b''.join(self.static_files(environ, start_response))
+        status, headers = start_response.call_args[0]
+        return status, dict(headers), body
+
+    def test_brotli_is_preferred(self):
+        status, headers, body = self.request(
+            '/static/app.0123456789ab.css', HTTP_ACCEPT_ENCODING='gzip, deflate, br'
+        )
+
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(body, b'br')
+        self.assertEqual(headers['Content-Encoding'], 'br')
+        self.assertEqual(headers['Content-Length'], '2')
+        self.assertEqual(headers['Content-Type'], 'text/css; charset=utf-8')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(headers['Cache-Control'], IMMUTABLE)
+
+    def test_encoding_negotiation(self):
+        _, headers, body = self.request(
+            '/static/app.0123456789ab.css', HTTP_ACCEPT_ENCODING='br;q=0, gzip'
+        )
+        self.assertEqual((headers['Content-Encoding'], body), ('gzip', b'gzip'))
+
+        _, headers, body = self.request('/static/app.0123456789ab.css')
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(body, b'body {}')
+
+    def test_unhashed_files_are_cached_briefly(self):
+        _, headers, _ = self.request('/static/app.css')
+
+        self.assertEqual(headers['Cache-Control'], SHORT)
+
+    def test_etag_revalidation(self):
+        _, headers, _ = self.request('/static/app.css')
+
+        status, _, body = self.request(
+            '/static/app.css', HTTP_IF_NONE_MATCH=headers['ETag']
+        )
+        self.assertEqual(status, '304 Not Modified')
+        self.assertEqual(body, b'')
+
+    def test_compressed_copies_are_not_served_directly(self):
+        _, _, body = self.request('/static/app.0123456789ab.css.gz')
+
+        self.assertEqual(body, b'from django')
+
+    def test_other_paths_pass_through(self):
+        _, _, body = self.request('/profile/')
+
+        self.assertEqual(body, b'from django')
+
+    def test_head_and_unsafe_methods(self):
+        status, headers, body = self.request('/static/app.css', method='HEAD')
+        self.assertEqual((status, body), ('200 OK', b''))
+        self.assertEqual(headers['Content-Length'], '7')
+
+        status, _, _ = self.request('/static/app.css', method='POST')
+        self.assertEqual(status, '405 Method Not Allowed')
@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.template.loader import get_template
+from django.test import TestCase
+from django.urls import reverse
+
+from users.page_cache import clear_page_cache
+from users.template_cache import warm_templates
+
+
+class TemplateCacheTestCase(TestCase):
+    def setUp(self):
+        clear_page_cache()
+
+    def test_templates_are_cached(self):
+        names = warm_templates()
+
+        self.assertIn('users/base.html', names)
+        self.assertIs(
+            get_template('users/home.html').template.template,
+            get_template('users/home.html').template.template,
+        )
+
+    def test_navbar_follows_auth_state(self):
+        user = User.objects.create_user(username='testuser', password='testpass')
+
+        response = self.client.get(reverse('users-home'))
+        self.assertContains(response, 'Sign in')
+        self.assertNotContains(response, 'Logout')
+
+        self.client.force_login(user)
+        response = self.client.get(reverse('users-home'))
+        self.assertContains(response, 'Logout')
+        self.assertNotContains(response, 'Sign in')
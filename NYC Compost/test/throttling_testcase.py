@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.contrib.auth import forms as auth_forms
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from users.throttling import throttle_stats
+
+RATES = {
+    'login_ip': '5/m',
+    'login_account': '2/m',
+    'password_reset_ip': '5/m',
+    'password_reset_account': '1/h',
+}
+
+
+@override_settings(
+    THROTTLE_RATES=RATES,
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class ThrottlingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        User.objects.create_user(
+            username='testuser', email='testuser@example.com', password='testpass'
+        )
+
+    def login(self, username='testuser'):
+        return self.client.post(
+            reverse('login'), {'username': username, 'password': 'wrongpass'}
+        )
+
+    def test_account_is_throttled_before_authentication(self):
+        with mock.patch.object(
+            auth_forms, 'authenticate', wraps=auth_forms.authenticate
+        ) as authenticate:
+            self.assertEqual(self.login().status_code, 200)
+            self.assertEqual(self.login().status_code, 200)
+
+            response = self.login()
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        # The throttled attempt never reached password hashing
+        self.assertEqual(authenticate.call_count, 2)
+
+    def test_account_names_are_case_insensitive(self):
+        self.login('testuser')
+        self.login('TestUser')
+
+        self.assertEqual(self.login('TESTUSER').status_code, 429)
+
+    def test_ip_is_throttled_across_accounts(self):
+        for i in range(5):
+            self.assertEqual(self.login(f'user{i}').status_code, 200)
+
+        self.assertEqual(self.login('another').status_code, 429)
+
+    def test_password_reset_is_throttled_before_sending(self):
+        url = reverse('password_reset')
+        self.client.post(url, {'email': 'testuser@example.com'})
+        response = self.client.post(url, {'email': 'testuser@example.com'})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(THROTTLE_CACHE='missing')
+    def test_in_process_fallback_without_cache(self):
+        self.login('fallback')
+        self.login('fallback')
+
+        self.assertEqual(self.login('fallback').status_code, 429)
+
+    def test_counters(self):
+        before = throttle_stats()
+        self.login()
+        self.login()
+        self.login()
+
+        after = throttle_stats()
+        allowed = after.get(('login', 'allowed'), 0) - before.get(('login', 'allowed'), 0)
+        throttled = after.get(('login', 'throttled'), 0) - before.get(('login', 'throttled'), 0)
+        self.assertEqual((allowed, throttled), (2, 1))
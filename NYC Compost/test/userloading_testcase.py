@@ -0,0 +1,58 @@
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from users.testing import RequestBudgetMixin
+
+
+class UserLoadingTestCase(RequestBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.login(username='testuser', password='testpass')
+        cache.clear()
+
+    def test_home_queries(self):
+        # One query for the session, one for the user and profile
+        with self.assertNumQueries(2):
+            self.client.get(reverse('users-home'))
+
+    def test_profile_get_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('users-profile'))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_anonymous_home_queries(self):
+        self.client.logout()
+
+        with self.assertNumQueries(0):
+            self.client.get(reverse('users-home'))
+
+    def test_sessions_from_model_backend_stay_logged_in(self):
+        session = self.client.session
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session.save()
+
+        response = self.client.get(reverse('users-profile'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'], self.user)
+
+    @override_settings(USER_CACHE_TIMEOUT=60)
+    def test_cached_user_skips_user_query(self):
+        self.client.get(reverse('users-profile'))
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse('users-profile'))
+
+    @override_settings(USER_CACHE_TIMEOUT=60)
+    def test_cached_user_is_invalidated_on_save(self):
+        self.client.get(reverse('users-home'))
+
+        self.user.profile.bio = 'Updated bio'
+        self.user.profile.save()
+
+        response = self.client.get(reverse('users-profile'))
+        self.assertContains(response, 'Updated bio')
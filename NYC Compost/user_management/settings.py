@@ -47,23 +47,38 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "users.metrics.RequestMetricsMiddleware",
+    "users.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "users.routers.ReplicaPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "users.page_cache.PageCacheMiddleware",
 ]
 
 ROOT_URLCONF = "user_management.urls"
 
+# Keep compiled templates in memory instead of reparsing them on every
+# render; the users templates are compiled at startup. runserver still
+# picks up template edits.
+TEMPLATE_CACHE = os.getenv("TEMPLATE_CACHE", "True") == "True"
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [("django.template.loaders.cached.Loader", TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "users.metrics.DjangoTemplates",
         "DIRS": [],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": TEMPLATE_LOADERS,
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -85,10 +100,81 @@ WSGI_APPLICATION = "user_management.wsgi.application"
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": os.getenv("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+        "CONN_MAX_AGE": int(os.getenv("CONN_MAX_AGE", 60)),
     }
 }
 
+# Read replicas, as a comma separated list of SQLite files kept in sync with
+# the primary by external replication. Any other database added here with a
+# "replica" alias works the same way.
+for index, path in enumerate(filter(None, os.getenv("SQLITE_REPLICAS", "").split(","))):
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        "NAME": path,
+        "TEST": {"MIRROR": "default"},
+    }
+
+# Reads go to a random replica and writes to the primary. After a successful
+# POST a client reads from the primary for REPLICA_PIN_SECONDS, so it sees
+# its own registration or profile changes.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith("replica")]
+DATABASE_ROUTERS = ["users.routers.PrimaryReplicaRouter"]
+REPLICA_PIN_SECONDS = 10
+
+# Applied to every new SQLite connection. WAL lets readers carry on while a
+# write is in progress, and with it synchronous=NORMAL is still safe against
+# corruption. busy_timeout (ms) makes writers wait for the lock instead of
+# failing with "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,
+    "mmap_size": 64 * 1024 * 1024,
+    "cache_size": -16000,
+    "temp_store": "memory",
+}
+
+
+# Limits per resolved view name on "queries", "sql_ms", "template_ms" and
+# "total_ms". Requests over budget are logged as warnings, and fail tests
+# that use users.testing.RequestBudgetMixin.
+REQUEST_BUDGETS = {
+    "users-home": {"queries": 2},
+    "users-profile": {"queries": 12},
+    "users-register": {"queries": 5},
+    "login": {"queries": 6},
+}
+
+# Prometheus metrics at /metrics. With several worker processes set
+# METRICS_DIR to a directory they share, and empty it when deploying.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "False") == "True"
+METRICS_DIR = os.getenv("METRICS_DIR")
+
+# cProfile a fraction of requests, overridden per view name by
+# PROFILE_VIEW_RATES, plus requests sending PROFILE_TOKEN in an X-Profile
+# header. Profiles are kept in PROFILE_DIR/<view name>/, the newest
+# PROFILE_KEEP of each, and summed up by `manage.py profile_report`.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_VIEW_RATES = {}
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_DIR = os.path.join(BASE_DIR, "profiles")
+PROFILE_KEEP = 100
+
+# One JSON line per request from users.metrics at INFO
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "users.metrics": {
+            "handlers": ["console"],
+            "level": os.getenv("REQUEST_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -111,9 +197,53 @@ AUTH_PASSWORD_VALIDATORS = [
 AUTHENTICATION_BACKENDS = (
     "social_core.backends.github.GithubOAuth2",
     "social_core.backends.google.GoogleOAuth2",
+    "users.backends.ProfileModelBackend",
+    # sessions record the backend that logged them in, so the ones created
+    # before ProfileModelBackend need ModelBackend to stay listed
     "django.contrib.auth.backends.ModelBackend",
 )
 
+# Lets people sign in with their email address as well as their username
+if os.getenv("EMAIL_LOGIN", "False") == "True":
+    AUTHENTICATION_BACKENDS += ("users.backends.EmailModelBackend",)
+
+# Attempts allowed per client IP and per account on the login and password
+# reset forms, as "<count>/<s|m|h|d>". Counters live in THROTTLE_CACHE, which
+# should be shared by all worker processes; THROTTLE_TRUSTED_PROXIES is the
+# number of load balancers that append to X-Forwarded-For.
+THROTTLE_ENABLED = True
+THROTTLE_CACHE = "default"
+THROTTLE_TRUSTED_PROXIES = int(os.getenv("THROTTLE_TRUSTED_PROXIES", 0))
+THROTTLE_RATES = {
+    "login_ip": "30/m",
+    "login_account": "10/m",
+    "password_reset_ip": "10/m",
+    "password_reset_account": "5/h",
+    "availability_ip": "60/m",
+}
+
+# The register page checks usernames and emails as they are typed against a
+# Bloom filter of the existing accounts, built on the first check; only
+# possible matches are confirmed in the database. Each process rebuilds its
+# filter every AVAILABILITY_FILTER_REFRESH seconds to see accounts created
+# by the others.
+AVAILABILITY_FILTER_CAPACITY = 100_000
+AVAILABILITY_FILTER_ERROR_RATE = 0.01
+AVAILABILITY_FILTER_REFRESH = 300
+
+# Keep last_login timestamps in memory and write them with one bulk UPDATE
+# every LAST_LOGIN_FLUSH_INTERVAL seconds, once LAST_LOGIN_BATCH_SIZE logins
+# are waiting and at shutdown. A crashed process loses its unwritten
+# timestamps, and password reset links stay valid until the flush.
+LAST_LOGIN_BUFFERED = os.getenv("LAST_LOGIN_BUFFERED", "False") == "True"
+LAST_LOGIN_FLUSH_INTERVAL = 30
+LAST_LOGIN_BATCH_SIZE = 200
+
+# Seconds to cache the session user and profile between requests, 0 disables
+# it. Saves through the ORM invalidate the entry; use a cache shared by all
+# worker processes when enabling this.
+USER_CACHE_TIMEOUT = int(os.getenv("USER_CACHE_TIMEOUT", 0))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -133,10 +263,41 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.2/howto/static-files/
 
 STATIC_URL = "/static/"
+STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
+
+# `collectstatic` fingerprints every file and writes .gz/.br copies, which the
+# static layer in user_management/wsgi.py serves with immutable cache headers;
+# off by default in development, where runserver serves the source files
+STATIC_MANIFEST = os.getenv("STATIC_MANIFEST", str(not DEBUG)) == "True"
+if STATIC_MANIFEST:
+    STATICFILES_STORAGE = "users.storage.CompressedManifestStaticFilesStorage"
 
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = "/media/"
 
+# Let the front-end server send media files once the view has checked them:
+# "X-Accel-Redirect" for nginx, with MEDIA_SENDFILE_PREFIX pointing at an
+# internal location aliased to MEDIA_ROOT, or "X-Sendfile" for Apache/lighttpd
+MEDIA_SENDFILE_HEADER = os.getenv("MEDIA_SENDFILE_HEADER")
+MEDIA_SENDFILE_PREFIX = "/protected-media/"
+
+# Square avatar variants in pixels, generated from every upload by
+# `python manage.py avatar_worker`; set AVATAR_ASYNC_PROCESSING to False to
+# generate them inside the request instead
+AVATAR_VARIANTS = {
+    "navbar": 40,
+    "admin": 64,
+    "profile": 100,
+    "profile_2x": 200,
+}
+AVATAR_ASYNC_PROCESSING = True
+# uploads over either budget are rejected before they are decoded
+AVATAR_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+AVATAR_MAX_PIXELS = 50_000_000
+AVATAR_JOB_MAX_ATTEMPTS = 3
+AVATAR_JOB_RETRY_DELAY = 30  # seconds, doubled on every retry
+AVATAR_JOB_TIMEOUT = 300  # running jobs older than this are picked up again
+
 
 LOGIN_REDIRECT_URL = "/"
 LOGIN_URL = "login"
@@ -151,7 +312,14 @@ SOCIAL_AUTH_GOOGLE_OAUTH2_KEY = str(os.getenv("GOOGLE_KEY"))
 SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET = str(os.getenv("GOOGLE_SECRET"))
 
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Mail is spooled to EMAIL_OUTBOX_DIR and delivered by
+# `python manage.py send_queued_mail` over EMAIL_OUTBOX_BACKEND
+EMAIL_BACKEND = "users.mail.OutboxEmailBackend"
+EMAIL_OUTBOX_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+EMAIL_OUTBOX_DIR = os.path.join(BASE_DIR, "outbox")
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+# seconds before the first retry of a failed delivery, doubled on every attempt
+EMAIL_OUTBOX_RETRY_DELAY = 30
 EMAIL_HOST = "smtp.gmail.com"
 EMAIL_USE_TLS = True
 EMAIL_PORT = 587
@@ -160,6 +328,60 @@ EMAIL_HOST_PASSWORD = str(os.getenv("EMAIL_PASSWORD"))
 
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 30
 
+# Session storage, one of "db", "cached_db", "cache" or "signed_cookies". The
+# db and cached_db stores only write when the session data changed. Sessions
+# are cached in local memory, or on disk under SESSION_CACHE_DIR so that all
+# worker processes on a host share them; "cache" keeps sessions nowhere else.
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "db")
+SESSION_ENGINE = {
+    "db": "users.sessions.db",
+    "cached_db": "users.sessions.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}[SESSION_BACKEND]
+SESSION_CACHE_ALIAS = "sessions"
+SESSION_CACHE_DIR = os.getenv("SESSION_CACHE_DIR")
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "sessions": (
+        {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": SESSION_CACHE_DIR,
+        }
+        if SESSION_CACHE_DIR
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "sessions",
+        }
+    ),
+    "pages": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "pages",
+    },
+}
+
+# Whole pages served to visitors without a session from PAGE_CACHE_ALIAS,
+# with a fresh CSRF token. Entries are keyed on DEPLOY_ID, or on the
+# template mtimes when it is not set, so a deploy or a template edit starts
+# from an empty cache. An empty PAGE_CACHE_VIEWS turns the cache off.
+PAGE_CACHE_VIEWS = (
+    ["users-home", "login", "users-register", "password_reset"]
+    if os.getenv("PAGE_CACHE", "True") == "True"
+    else []
+)
+PAGE_CACHE_ALIAS = "pages"
+PAGE_CACHE_TIMEOUT = 60 * 10
+DEPLOY_ID = os.getenv("DEPLOY_ID")
+
+# Seconds between purges of expired sessions by a background thread in each
+# web process, 0 leaves it to `python manage.py purge_sessions` from cron
+SESSION_PURGE_INTERVAL = int(os.getenv("SESSION_PURGE_INTERVAL", 0))
+SESSION_PURGE_BATCH_SIZE = 500
+SESSION_PURGE_TIME_BUDGET = 2  # seconds per purge
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
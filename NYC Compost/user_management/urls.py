@@ -1,17 +1,23 @@
+import re
+
 from django.contrib import admin
 
 from django.urls import path, include, re_path
 
 from django.conf import settings
-from django.conf.urls.static import static
 
 from django.contrib.auth import views as auth_views
+from users.media import serve_media
+from users.metrics import view_metrics
+from users.prometheus import metrics
 from users.views import CustomLoginView, ResetPasswordView, ChangePasswordView
 
 from users.forms import LoginForm
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics, name="metrics"),
+    path("metrics/views/", view_metrics, name="view-metrics"),
     path("", include("users.urls")),
     path(
         "login/",
@@ -44,4 +50,9 @@ urlpatterns = [
     ),
     path("password-change/", ChangePasswordView.as_view(), name="password_change"),
     re_path(r"^oauth/", include("social_django.urls", namespace="social")),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    re_path(
+        r"^%s(?P<path>.*)$" % re.escape(settings.MEDIA_URL.lstrip("/")),
+        serve_media,
+        name="media",
+    ),
+]
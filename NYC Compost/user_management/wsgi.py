@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from users.wsgi_static import StaticFiles
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "user_management.settings")
 
 application = get_wsgi_application()
+
+# serve the output of collectstatic, once it has been run
+if os.path.isdir(settings.STATIC_ROOT):
+    application = StaticFiles(application, settings.STATIC_ROOT, settings.STATIC_URL)
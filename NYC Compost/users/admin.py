@@ -1,4 +1,28 @@
 from django.contrib import admin
-from .models import Profile
+from django.utils.html import format_html
 
-admin.site.register(Profile)
+from .models import Profile, AvatarJob
+
+
+@admin.register(Profile)
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "thumbnail"]
+    list_select_related = ["user"]
+
+    def thumbnail(self, obj):
+        return format_html(
+            '<img src="{}" width="32" height="32">', obj.avatar_variant_url("admin")
+        )
+
+
+@admin.register(AvatarJob)
+class AvatarJobAdmin(admin.ModelAdmin):
+    list_display = [
+        "name",
+        "status",
+        "attempts",
+        "created_at",
+        "finished_at",
+        "peak_rss",
+    ]
+    list_filter = ["status"]
@@ -1,4 +1,9 @@
+import atexit
+
 from django.apps import AppConfig
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db.backends.signals import connection_created
 
 
 class UserConfig(AppConfig):
@@ -7,3 +12,27 @@ class UserConfig(AppConfig):
 
     def ready(self):
         import users.signals  # noqa
+        from .availability import refresh_filter
+        from .background import schedule
+        from .db import configure_sqlite
+        from .last_login import flush_last_logins, record_last_login
+        from .sessions.purge import purge_sessions_task, uses_database
+        from .template_cache import warm_templates
+
+        connection_created.connect(configure_sqlite, dispatch_uid="configure_sqlite")
+
+        if settings.SESSION_PURGE_INTERVAL and uses_database():
+            schedule(settings.SESSION_PURGE_INTERVAL, purge_sessions_task)
+
+        user_logged_in.disconnect(dispatch_uid="update_last_login")
+        user_logged_in.connect(record_last_login, dispatch_uid="update_last_login")
+        if settings.LAST_LOGIN_BUFFERED:
+            schedule(settings.LAST_LOGIN_FLUSH_INTERVAL, flush_last_logins)
+            atexit.register(flush_last_logins)
+
+        # picks up accounts created by other processes
+        if settings.AVAILABILITY_FILTER_REFRESH:
+            schedule(settings.AVAILABILITY_FILTER_REFRESH, refresh_filter)
+
+        if settings.TEMPLATE_CACHE:
+            warm_templates()
@@ -0,0 +1,38 @@
+from django.contrib.staticfiles import finders
+
+# Front-end libraries, served from users/static/vendor, where
+# `python manage.py vendor_static` puts them, and from their CDN if the files
+# are missing. Integrity hashes are checked on download and sent to the CDN,
+# so every asset needs one.
+VENDOR_ASSETS = {
+    "bootstrap.css": {
+        "url": "https://maxcdn.bootstrapcdn.com/bootstrap/4.0.0/css/bootstrap.min.css",
+        "path": "vendor/bootstrap-4.0.0/css/bootstrap.min.css",
+        "integrity": "sha384-Gn5384xqQ1aoWXA+058RXPxPg6fy4IWvTNh0E263XmFcJlSAwiGgFAW/dAiS6JXm",
+    },
+    "fontawesome.css": {
+        "url": "https://use.fontawesome.com/releases/v5.15.4/css/all.css",
+        "path": "vendor/fontawesome-5.15.4/css/all.css",
+        "integrity": "sha384-DyZ88mC6Up2uqS4h/KRgHuoeGwBcD4Ng9SiP4dIRy0EXTlnuz47vAwmeGwVChigm",
+    },
+    "jquery.js": {
+        "url": "https://code.jquery.com/jquery-3.2.1.min.js",
+        "path": "vendor/jquery-3.2.1/jquery.min.js",
+        "integrity": "sha384-xBuQ/xzmlsLoJpyjoggmTEz8OWUFM0/RC5BsqQBDX2v5cMvDHcMakNTNrHIW2I5f",
+    },
+    # Popper is included in the bundle
+    "bootstrap.js": {
+        "url": "https://cdn.jsdelivr.net/npm/bootstrap@4.0.0/dist/js/bootstrap.bundle.min.js",
+        "path": "vendor/bootstrap-4.0.0/js/bootstrap.bundle.min.js",
+        "integrity": "sha384-feJI7QwhOS+hwpX2zkaeJQjeiwlhOP+SdQDqhgvvo1DsjtiSQByFdThsxO669S2D",
+    },
+}
+
+_vendored = {}
+
+
+def is_vendored(name):
+    # looked up once per process, vendoring happens before a deploy
+    if name not in _vendored:
+        _vendored[name] = finders.find(VENDOR_ASSETS[name]["path"]) is not None
+    return _vendored[name]
@@ -0,0 +1,123 @@
+import hashlib
+import math
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from .models import Profile, email_key
+from .prometheus import Counter
+
+AVAILABILITY_CHECKS = Counter(
+    "availability_checks_total",
+    "Username and email availability checks by field and by what answered "
+    "them (filter or database).",
+    ("field", "answered_by"),
+)
+
+
+class BloomFilter:
+    # no false negatives, and false positives at about error_rate once
+    # capacity values have been added
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(capacity, 1)
+        self.size = max(
+            8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # double hashing over two halves of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little")
+        b = int.from_bytes(digest[8:], "little") | 1
+        return [(a + i * b) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+_filter = None
+# keys added while a rebuild is reading the users, None when not rebuilding
+_pending = None
+_filter_lock = threading.Lock()
+_build_lock = threading.RLock()
+
+
+def _keys(username, email):
+    yield f"username:{username}"
+    if email:
+        yield f"email:{email_key(email)}"
+
+
+def build_filter():
+    global _filter, _pending
+    with _build_lock:
+        with _filter_lock:
+            _pending = []
+        try:
+            users = User.objects.values_list("username", "email")
+            bloom = BloomFilter(
+                max(settings.AVAILABILITY_FILTER_CAPACITY, users.count() * 4),
+                settings.AVAILABILITY_FILTER_ERROR_RATE,
+            )
+            for username, email in users.iterator(chunk_size=5000):
+                for key in _keys(username, email):
+                    bloom.add(key)
+            # users created after the read started went into the old filter
+            with _filter_lock:
+                for key in _pending:
+                    bloom.add(key)
+                _filter = bloom
+        finally:
+            with _filter_lock:
+                _pending = None
+    return bloom
+
+
+def get_filter():
+    # built on first use, and again once full so the error rate holds
+    bloom = _filter
+    if bloom is None or bloom.count > bloom.capacity:
+        with _build_lock:
+            bloom = _filter
+            if bloom is None or bloom.count > bloom.capacity:
+                bloom = build_filter()
+    return bloom
+
+
+def add_user(username, email):
+    # renamed users keep their old keys, which only costs a database check
+    with _filter_lock:
+        for key in _keys(username, email):
+            if _filter is not None:
+                _filter.add(key)
+            if _pending is not None:
+                _pending.append(key)
+
+
+def refresh_filter():
+    if _filter is not None:
+        build_filter()
+
+
+def is_taken(field, value):
+    key = f"{field}:{value if field == 'username' else email_key(value)}"
+    if key not in get_filter():
+        AVAILABILITY_CHECKS.inc(field=field, answered_by="filter")
+        return False
+
+    AVAILABILITY_CHECKS.inc(field=field, answered_by="database")
+    if field == "username":
+        return User.objects.filter(username=value).exists()
+    return Profile.objects.filter(email_lower=email_key(value)).exists()
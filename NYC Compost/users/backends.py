@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .models import Profile, email_key
+
+UserModel = get_user_model()
+
+
+def user_cache_key(user_id):
+    return f"users:user:{user_id}"
+
+
+def invalidate_cached_users(user_ids):
+    if settings.USER_CACHE_TIMEOUT:
+        cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
+
+
+class ProfileModelBackend(ModelBackend):
+    # the session user is loaded together with its profile in one query, and
+    # optionally kept in the cache until users.signals invalidates it
+    def get_user(self, user_id):
+        timeout = settings.USER_CACHE_TIMEOUT
+        user = cache.get(user_cache_key(user_id)) if timeout else None
+
+        if user is None:
+            try:
+                user = UserModel._default_manager.select_related("profile").get(
+                    pk=user_id
+                )
+            except UserModel.DoesNotExist:
+                return None
+            if timeout:
+                cache.set(user_cache_key(user_id), user, timeout)
+
+        return user if self.user_can_authenticate(user) else None
+
+
+class EmailModelBackend(ProfileModelBackend):
+    # signs people in with their email address in the username field
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None or password is None or "@" not in username:
+            return None
+
+        try:
+            profile = Profile.objects.select_related("user").get(
+                email_lower=email_key(username)
+            )
+        except (Profile.DoesNotExist, Profile.MultipleObjectsReturned):
+            # run the hasher anyway, like ModelBackend, to keep timing even
+            UserModel().set_password(password)
+            return None
+
+        user = profile.user
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
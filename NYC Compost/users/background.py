@@ -0,0 +1,47 @@
+import logging
+import threading
+
+from django.core.signals import request_started
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+_tasks = []
+_tasks_lock = threading.Lock()
+
+
+class PeriodicTask(threading.Thread):
+    def __init__(self, interval, function):
+        super().__init__(name=f"periodic-{function.__name__}", daemon=True)
+        self.interval = interval
+        self.function = function
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                close_old_connections()
+                self.function()
+            except Exception:
+                logger.exception("Periodic task %s failed", self.function.__name__)
+            finally:
+                connection.close()
+
+    def stop(self):
+        self.stopped.set()
+
+
+def schedule(interval, function):
+    # tasks start with the first request, so management commands like
+    # migrate never run them
+    with _tasks_lock:
+        _tasks.append(PeriodicTask(interval, function))
+    request_started.connect(_start_tasks, dispatch_uid=__name__)
+
+
+def _start_tasks(**kwargs):
+    request_started.disconnect(dispatch_uid=__name__)
+    with _tasks_lock:
+        for task in _tasks:
+            if task.ident is None:
+                task.start()
@@ -0,0 +1,15 @@
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    # pragmas are per connection, except journal_mode which sticks to the file
+    if connection.vendor != "sqlite":
+        return
+
+    # run on the raw connection, so query counts and logs leave them out
+    connection.connection.executescript(
+        "".join(
+            f"PRAGMA {name} = {value};"
+            for name, value in settings.SQLITE_PRAGMAS.items()
+        )
+    )
@@ -1,11 +1,33 @@
 from django import forms
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from django.contrib.auth.forms import (
+    AuthenticationForm,
+    PasswordResetForm,
+    UserCreationForm,
+    _unicode_ci_compare,
+)
 
-from .models import Profile
+from .images import AvatarTooLarge, check_limits
+from .models import Profile, email_key
+from .prometheus import EMAIL_SEND
 
 
-class RegisterForm(UserCreationForm):
+class UniqueEmailMixin:
+    # looked up through the indexed copy on the profile
+    def clean_email(self):
+        email = self.cleaned_data["email"]
+        others = Profile.objects.filter(email_lower=email_key(email))
+        if self.instance.pk is not None:
+            others = others.exclude(user_id=self.instance.pk)
+        if others.exists():
+            raise forms.ValidationError(
+                "A user with that email address already exists.", code="duplicate_email"
+            )
+        return email
+
+
+class RegisterForm(UniqueEmailMixin, UserCreationForm):
     # fields we want to include and customize in our form
     first_name = forms.CharField(
         max_length=100,
@@ -114,7 +136,7 @@ class LoginForm(AuthenticationForm):
         fields = ["username", "password", "remember_me"]
 
 
-class UpdateUserForm(forms.ModelForm):
+class UpdateUserForm(UniqueEmailMixin, forms.ModelForm):
     username = forms.CharField(
         max_length=100,
         required=True,
@@ -129,10 +151,48 @@ class UpdateUserForm(forms.ModelForm):
         fields = ["username", "email"]
 
 
+class ResetPasswordForm(PasswordResetForm):
+    def get_users(self, email):
+        # same checks as PasswordResetForm, without the unindexed iexact scan;
+        # the address mail goes to must still match the one typed in
+        active_users = User._default_manager.filter(
+            profile__email_lower=email_key(email), is_active=True
+        )
+        return (
+            user
+            for user in active_users
+            if user.has_usable_password() and _unicode_ci_compare(email, user.email)
+        )
+
+    def send_mail(self, *args, **kwargs):
+        with EMAIL_SEND.time(stage="spool"):
+            super().send_mail(*args, **kwargs)
+
+
+class AvatarField(forms.ImageField):
+    # the byte budget is checked before Pillow reads the upload at all, the
+    # pixel budget right after it has parsed the header
+    def to_python(self, data):
+        if data is not None:
+            try:
+                check_limits(size=data.size, max_bytes=settings.AVATAR_MAX_UPLOAD_BYTES)
+            except AvatarTooLarge as error:
+                raise forms.ValidationError(str(error), code="file_too_large")
+
+        f = super().to_python(data)
+
+        if f is not None:
+            try:
+                check_limits(
+                    dimensions=f.image.size, max_pixels=settings.AVATAR_MAX_PIXELS
+                )
+            except AvatarTooLarge as error:
+                raise forms.ValidationError(str(error), code="too_many_pixels")
+        return f
+
+
 class UpdateProfileForm(forms.ModelForm):
-    avatar = forms.ImageField(
-        widget=forms.FileInput(attrs={"class": "form-control-file"})
-    )
+    avatar = AvatarField(widget=forms.FileInput(attrs={"class": "form-control-file"}))
     bio = forms.CharField(
         widget=forms.Textarea(attrs={"class": "form-control", "rows": 5})
     )
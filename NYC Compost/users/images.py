@@ -0,0 +1,163 @@
+import os
+import resource
+import sys
+from contextlib import contextmanager
+
+from PIL import Image, features
+
+VARIANT_QUALITY = 85
+
+
+def _encoders():
+    # every variant is written as JPEG, plus the smaller formats this Pillow
+    # build can encode; the media view picks one from the Accept header
+    encoders = [("jpg", "JPEG", {"quality": VARIANT_QUALITY, "optimize": True})]
+    if features.check("webp"):
+        encoders.append(("webp", "WEBP", {"quality": 80, "method": 6}))
+    if "avif" in features.modules and features.check_module("avif"):
+        encoders.append(("avif", "AVIF", {"quality": 60}))
+    return encoders
+
+
+VARIANT_ENCODERS = _encoders()
+VARIANT_EXTENSIONS = [extension for extension, _, _ in VARIANT_ENCODERS]
+
+# keep at least this much resolution above the largest variant before resampling
+REDUCING_GAP = 2
+
+
+class AvatarTooLarge(ValueError):
+    pass
+
+
+def variant_name(key, size, extension="jpg"):
+    return f"profile_images/variants/{key}-{size}.{extension}"
+
+
+def _encoded_paths(path):
+    base = os.path.splitext(path)[0]
+    return [(f"{base}.{extension}", f, o) for extension, f, o in VARIANT_ENCODERS]
+
+
+def check_limits(size=None, dimensions=None, max_bytes=None, max_pixels=None):
+    if max_bytes and size is not None and size > max_bytes:
+        raise AvatarTooLarge(f"Image is {size} bytes, the limit is {max_bytes} bytes")
+    if max_pixels and dimensions is not None:
+        width, height = dimensions
+        if width * height > max_pixels:
+            raise AvatarTooLarge(
+                f"Image is {width}x{height} pixels, the limit is {max_pixels} pixels"
+            )
+
+
+def _reset_peak_rss():
+    # Linux lets a process reset its high-water mark, elsewhere the lifetime
+    # peak is reported instead
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def process_peak_rss():
+    # the whole process, so with threads it covers every image in flight
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes everywhere but macOS, which reports bytes
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+@contextmanager
+def measure_peak_rss():
+    usage = {}
+    _reset_peak_rss()
+    try:
+        yield usage
+    finally:
+        usage["peak_rss"] = process_peak_rss()
+
+
+def _open_reduced(img, size):
+    # JPEG can decode straight at 1/2, 1/4 or 1/8 scale, other formats are
+    # shrunk by an integer factor right after decoding
+    target = size * REDUCING_GAP
+    img.draft("RGB", (target, target))
+
+    factor = min(img.size) // target
+    if factor >= 2:
+        return img.reduce(factor)
+    img.load()
+    return img
+
+
+def _square(img):
+    side = min(img.size)
+    left = (img.width - side) // 2
+    top = (img.height - side) // 2
+    return img.crop((left, top, left + side, top + side))
+
+
+def _flatten(img):
+    if img.mode in ("RGBA", "LA") or "transparency" in img.info:
+        # avatars sit on a white page, so flattening keeps them looking the same
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, "white")
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def generate_variants(source, targets, max_bytes=None, max_pixels=None, force=False):
+    # targets are (size, path) pairs naming the JPEG variant, other formats are
+    # written next to it; existing variants are only rebuilt with force, and
+    # are replaced in place so they never go missing
+    missing = [
+        (size, path)
+        for size, path in targets
+        if force or not all(os.path.exists(p) for p, _, _ in _encoded_paths(path))
+    ]
+    if not missing:
+        return []
+
+    check_limits(size=os.path.getsize(source), max_bytes=max_bytes)
+    with Image.open(source) as img:
+        # only the header has been read so far
+        check_limits(dimensions=img.size, max_pixels=max_pixels)
+        img = _flatten(_square(_open_reduced(img, max(missing)[0])))
+
+    # decode once and resize largest first, each step starting from the last
+    for size, path in sorted(missing, reverse=True):
+        if img.width > size:
+            img = img.resize((size, size), Image.LANCZOS)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for encoded_path, format, options in _encoded_paths(path):
+            temp_path = f"{encoded_path}.{os.getpid()}.tmp"
+            img.save(temp_path, format, **options)
+            os.replace(temp_path, encoded_path)
+
+    return [path for _, path in missing]
+
+
+def process_avatar(
+    source, targets, max_bytes=None, max_pixels=None, force=False, measure=False
+):
+    # the peak is only the upload's own when nothing else runs in the
+    # process, so callers ask for it from single-job pool processes
+    if not measure:
+        generate_variants(
+            source, targets, max_bytes=max_bytes, max_pixels=max_pixels, force=force
+        )
+        return None
+    with measure_peak_rss() as usage:
+        generate_variants(
+            source, targets, max_bytes=max_bytes, max_pixels=max_pixels, force=force
+        )
+    return usage["peak_rss"]
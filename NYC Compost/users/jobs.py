@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .backends import invalidate_cached_users
+from .images import AvatarTooLarge
+from .models import AvatarJob, Profile
+
+
+def claim_jobs(limit):
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.AVATAR_JOB_TIMEOUT)
+    # jobs left running by a worker that died are picked up again
+    abandoned = Q(status=AvatarJob.RUNNING, started_at__lt=stale)
+    claimable = Q(status=AvatarJob.PENDING, run_after__lte=now) | abandoned
+
+    with transaction.atomic():
+        # a job whose worker died on its last attempt is not tried again
+        AvatarJob.objects.filter(
+            abandoned, attempts__gte=settings.AVATAR_JOB_MAX_ATTEMPTS
+        ).update(
+            status=AvatarJob.FAILED,
+            finished_at=now,
+            last_error="Worker stopped while processing the job",
+        )
+
+        ids = list(
+            AvatarJob.objects.filter(claimable).values_list("pk", flat=True)[:limit]
+        )
+        # attempts are counted when claimed, so crashes count too; the
+        # conditions are checked again so only one worker gets each job
+        AvatarJob.objects.filter(claimable, pk__in=ids).update(
+            status=AvatarJob.RUNNING, started_at=now, attempts=F("attempts") + 1
+        )
+
+    return list(
+        AvatarJob.objects.filter(pk__in=ids, status=AvatarJob.RUNNING, started_at=now)
+    )
+
+
+def release_jobs(jobs):
+    # back to the queue without using up an attempt, for jobs that never ran
+    AvatarJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+        status=AvatarJob.PENDING, attempts=F("attempts") - 1
+    )
+
+
+def complete_job(job, peak_rss=None):
+    job.status = AvatarJob.DONE
+    job.finished_at = timezone.now()
+    job.last_error = ""
+    job.peak_rss = peak_rss
+    job.save(
+        update_fields=["status", "attempts", "finished_at", "last_error", "peak_rss"]
+    )
+
+    # the upload may have been replaced while the job was waiting
+    profiles = Profile.objects.filter(pk=job.profile_id, avatar=job.name)
+    profiles.update(avatar_ready=True)
+    invalidate_cached_users(profiles.values_list("user_id", flat=True))
+
+
+def fail_job(job, error):
+    job.last_error = f"{type(error).__name__}: {error}"
+
+    # an image over budget will not fit on the next attempt either
+    if (
+        isinstance(error, AvatarTooLarge)
+        or job.attempts >= settings.AVATAR_JOB_MAX_ATTEMPTS
+    ):
+        job.status = AvatarJob.FAILED
+        job.finished_at = timezone.now()
+    else:
+        job.status = AvatarJob.PENDING
+        job.run_after = timezone.now() + job.retry_delay()
+
+    job.save(
+        update_fields=["status", "attempts", "last_error", "run_after", "finished_at"]
+    )
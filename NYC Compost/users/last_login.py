@@ -0,0 +1,41 @@
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import User, update_last_login
+from django.utils import timezone
+
+from .backends import invalidate_cached_users
+
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def record_last_login(sender, user, **kwargs):
+    # replaces django.contrib.auth's receiver, which saves the user on every
+    # login and with it fires the profile signals
+    if not settings.LAST_LOGIN_BUFFERED:
+        return update_last_login(sender, user, **kwargs)
+
+    user.last_login = timezone.now()
+    with _pending_lock:
+        _pending[user.pk] = user.last_login
+        full = len(_pending) >= settings.LAST_LOGIN_BATCH_SIZE
+
+    if full:
+        flush_last_logins()
+
+
+def flush_last_logins():
+    global _pending
+    with _pending_lock:
+        pending, _pending = _pending, {}
+
+    if not pending:
+        return 0
+
+    User.objects.bulk_update(
+        [User(pk=pk, last_login=last_login) for pk, last_login in pending.items()],
+        ["last_login"],
+    )
+    invalidate_cached_users(pending)
+    return len(pending)
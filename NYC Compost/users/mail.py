@@ -0,0 +1,121 @@
+import logging
+import os
+import pickle
+import time
+import uuid
+
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+
+logger = logging.getLogger(__name__)
+
+# the outbox is a maildir-like spool: messages are written to tmp/, appear
+# atomically in new/, are moved to cur/ by the worker sending them and to
+# failed/ once they run out of attempts
+SPOOL_DIRS = ("tmp", "new", "cur", "failed")
+
+
+def _spool_path(*parts):
+    return os.path.join(settings.EMAIL_OUTBOX_DIR, *parts)
+
+
+def _ensure_spool():
+    for name in SPOOL_DIRS:
+        os.makedirs(_spool_path(name), exist_ok=True)
+
+
+def _parse_name(name):
+    # <enqueued timestamp>-<id>-<attempts>-<not before timestamp>; messages
+    # spooled before retries were delayed have no not-before part
+    enqueued, message_id, attempts, *not_before = name.split("-")
+    not_before = float(not_before[0]) if not_before else 0.0
+    return float(enqueued), message_id, int(attempts), not_before
+
+
+def _is_due(name, now):
+    return _parse_name(name)[3] <= now
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    # requests only write the message to disk, `manage.py send_queued_mail`
+    # delivers it over EMAIL_OUTBOX_BACKEND
+    def send_messages(self, email_messages):
+        _ensure_spool()
+        for message in email_messages:
+            message.connection = None
+            now = time.time()
+            name = f"{now:.6f}-{uuid.uuid4().hex}-0-{now:.6f}"
+            with open(_spool_path("tmp", name), "wb") as f:
+                pickle.dump(message, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(_spool_path("tmp", name), _spool_path("new", name))
+        return len(email_messages)
+
+
+def claim(limit):
+    _ensure_spool()
+    claimed = []
+    now = time.time()
+    # messages waiting out a retry delay stay in new/ until they are due
+    due = sorted(name for name in os.listdir(_spool_path("new")) if _is_due(name, now))
+    for name in due[:limit]:
+        try:
+            # whichever worker renames the file first owns it
+            os.replace(_spool_path("new", name), _spool_path("cur", name))
+        except FileNotFoundError:
+            continue
+        os.utime(_spool_path("cur", name))
+
+        try:
+            with open(_spool_path("cur", name), "rb") as f:
+                message = pickle.load(f)
+        except Exception:
+            logger.exception("Unreadable message %s in the outbox", name)
+            os.replace(_spool_path("cur", name), _spool_path("failed", name))
+            continue
+        claimed.append((name, message))
+    return claimed
+
+
+def delivered(name):
+    os.remove(_spool_path("cur", name))
+    return time.time() - _parse_name(name)[0]
+
+
+def release(name, error):
+    enqueued, message_id, attempts, _ = _parse_name(name)
+    attempts += 1
+    if attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        logger.error("Giving up on message %s: %s", name, error)
+        os.replace(_spool_path("cur", name), _spool_path("failed", name))
+    else:
+        # an unreachable server gets 1, 2, 4, ... times the delay to recover
+        delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+        not_before = time.time() + delay
+        retry = f"{enqueued:.6f}-{message_id}-{attempts}-{not_before:.6f}"
+        os.replace(_spool_path("cur", name), _spool_path("new", retry))
+
+
+def recover(stale_after):
+    # messages left in cur/ by a worker that died are queued again
+    _ensure_spool()
+    cutoff = time.time() - stale_after
+    for name in os.listdir(_spool_path("cur")):
+        try:
+            if os.path.getmtime(_spool_path("cur", name)) < cutoff:
+                os.replace(_spool_path("cur", name), _spool_path("new", name))
+        except FileNotFoundError:
+            continue
+
+
+def outbox_stats():
+    _ensure_spool()
+    queued = os.listdir(_spool_path("new"))
+    oldest = min((_parse_name(name)[0] for name in queued), default=None)
+    now = time.time()
+    return {
+        "queue_depth": len(queued),
+        "waiting_retry": sum(not _is_due(name, now) for name in queued),
+        "in_flight": len(os.listdir(_spool_path("cur"))),
+        "failed": len(os.listdir(_spool_path("failed"))),
+        "oldest_age": now - oldest if oldest is not None else 0.0,
+    }
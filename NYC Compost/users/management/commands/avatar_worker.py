@@ -0,0 +1,125 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.images import generate_variants, process_avatar, process_peak_rss
+from users.jobs import claim_jobs, complete_job, fail_job, release_jobs
+from users.models import DEFAULT_AVATAR, avatar_storage, variant_targets
+from users.prometheus import AVATAR_PROCESSING
+from users.routers import use_primary
+
+
+def timed_process_avatar(*args, **kwargs):
+    # timed inside the pool, so queueing behind other jobs is left out
+    begin = time.perf_counter()
+    peak_rss = process_avatar(*args, **kwargs)
+    return peak_rss, time.perf_counter() - begin
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate variants of queued avatar uploads with a pool of threads or processes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--processes",
+            action="store_true",
+            help="Use a process pool instead of threads",
+        )
+        parser.add_argument("--batch-size", type=int, default=20)
+        parser.add_argument("--poll-interval", type=float, default=2.0)
+        parser.add_argument(
+            "--once", action="store_true", help="Exit when the queue is empty"
+        )
+
+    def handle(self, *args, **options):
+        if avatar_storage.exists(DEFAULT_AVATAR):
+            generate_variants(
+                avatar_storage.path(DEFAULT_AVATAR), variant_targets(DEFAULT_AVATAR)
+            )
+
+        pool_class = ProcessPoolExecutor if options["processes"] else ThreadPoolExecutor
+        pool = pool_class(max_workers=options["workers"])
+
+        # claims must see the job states just written by other workers
+        try:
+            with use_primary():
+                while True:
+                    jobs = claim_jobs(options["batch_size"])
+
+                    if not jobs:
+                        if options["once"]:
+                            break
+                        time.sleep(options["poll_interval"])
+                        continue
+
+                    if not self.process_batch(pool, jobs):
+                        # a child process died and took the pool with it
+                        self.stderr.write("Process pool broke, restarting it")
+                        pool.shutdown(wait=False)
+                        pool = pool_class(max_workers=options["workers"])
+        finally:
+            pool.shutdown()
+
+    def process_batch(self, pool, jobs):
+        started = time.monotonic()
+        # threads share one process, so only its overall peak is known
+        processes = isinstance(pool, ProcessPoolExecutor)
+        try:
+            futures = {
+                pool.submit(
+                    timed_process_avatar,
+                    job.path,
+                    variant_targets(job.name),
+                    max_bytes=settings.AVATAR_MAX_UPLOAD_BYTES,
+                    max_pixels=settings.AVATAR_MAX_PIXELS,
+                    measure=processes,
+                ): job
+                for job in jobs
+            }
+        except BrokenProcessPool:
+            release_jobs(jobs)
+            return False
+
+        failed = 0
+        peak = 0
+        broken = []
+
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                peak_rss, seconds = future.result()
+            except BrokenProcessPool:
+                broken.append(job)
+            except Exception as error:
+                fail_job(job, error)
+                failed += 1
+            else:
+                AVATAR_PROCESSING.observe(seconds, mode="worker")
+                complete_job(job, peak_rss=peak_rss)
+                if peak_rss is not None:
+                    peak = max(peak, peak_rss)
+
+        # the image that killed the child cannot be told apart from the others
+        # in flight, so all of them keep the attempt; one that keeps crashing
+        # the pool runs out of attempts like any other failure
+        for job in broken:
+            fail_job(job, BrokenProcessPool("Worker process died"))
+        failed += len(broken)
+
+        elapsed = time.monotonic() - started
+        if processes:
+            memory = f"peak RSS per job {peak / 1024 / 1024:.1f} MiB"
+        else:
+            memory = f"process peak RSS {process_peak_rss() / 1024 / 1024:.1f} MiB"
+        self.stdout.write(
+            f"Processed {len(jobs)} avatar jobs ({failed} failed) "
+            f"in {elapsed:.2f}s, {len(jobs) / elapsed:.1f} jobs/s, "
+            f"{memory}"
+        )
+        return not broken
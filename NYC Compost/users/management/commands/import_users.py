@@ -0,0 +1,227 @@
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import reset_queries, transaction
+
+from users.availability import add_user
+from users.models import Profile, email_key
+from users.routers import use_primary
+
+FIELDS = ("username", "email", "first_name", "last_name", "password", "bio")
+validate_username = UnicodeUsernameValidator()
+
+
+def hash_password(password):
+    # rows without a password get an unusable one, like the admin does
+    return make_password(password or None)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users and their profiles from a CSV or NDJSON file with the columns "
+        + ", ".join(FIELDS)
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, - for standard input")
+        parser.add_argument(
+            "--format",
+            choices=("csv", "ndjson"),
+            help="Defaults to the file extension, csv for standard input",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Size of the process pool hashing passwords, 0 hashes inline",
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.stats = {"created": 0, "skipped": 0}
+        path = options["path"]
+        file_format = options["format"] or (
+            "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+        )
+
+        try:
+            f = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        except OSError as e:
+            raise CommandError(e)
+
+        pool = None
+        if options["workers"]:
+            pool = ProcessPoolExecutor(
+                max_workers=options["workers"], initializer=django.setup
+            )
+
+        started = time.monotonic()
+        # duplicates are looked up among rows this run has just written
+        try:
+            with f, use_primary():
+                rows = self.read_csv(f) if file_format == "csv" else self.read_ndjson(f)
+                # the next batch is hashed while the current one is inserted,
+                # so at most two batches are held in memory
+                pending = None
+                for batch in self.batches(rows):
+                    hashing = self.hash_batch(pool, batch)
+                    if pending is not None:
+                        self.insert(*pending, started)
+                    pending = (batch, hashing)
+                if pending is not None:
+                    self.insert(*pending, started)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f"Done: {self.stats['created']} users created, {self.stats['skipped']} "
+            f"skipped in {elapsed:.1f}s, {self.stats['created'] / elapsed:.0f} rows/s"
+        )
+
+    def read_csv(self, f):
+        reader = csv.DictReader(f)
+        if "username" not in (reader.fieldnames or ()):
+            raise CommandError("The file has no username column")
+        for line, row in enumerate(reader, start=2):
+            yield line, row
+
+    def read_ndjson(self, f):
+        for line, text in enumerate(f, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as e:
+                self.skip(line, f"not JSON: {e}")
+                continue
+            if not isinstance(row, dict):
+                self.skip(line, "not an object")
+                continue
+            yield line, row
+
+    def skip(self, line, reason):
+        self.stats["skipped"] += 1
+        self.stderr.write(f"line {line}: {reason}")
+
+    def clean(self, line, row):
+        row = {field: str(row.get(field) or "").strip() for field in FIELDS}
+        try:
+            validate_username(row["username"])
+            if not row["username"] or len(row["username"]) > 150:
+                raise ValidationError("Enter a username of up to 150 characters.")
+            if row["email"]:
+                validate_email(row["email"])
+        except ValidationError as e:
+            self.skip(line, " ".join(e.messages))
+            return None
+        return row
+
+    def batches(self, rows):
+        # a batch is checked against the database before the previous one is
+        # inserted, so duplicates are also looked for in the previous batch
+        batch, seen, previous = [], set(), set()
+        for line, row in rows:
+            row = self.clean(line, row)
+            if row is None:
+                continue
+            keys = {f"username:{row['username']}"}
+            if row["email"]:
+                keys.add(f"email:{email_key(row['email'])}")
+            if keys & seen or keys & previous:
+                self.skip(line, "duplicate username or email in the file")
+                continue
+            seen |= keys
+            batch.append((line, row))
+            if len(batch) == self.options["batch_size"]:
+                yield self.exclude_existing(batch)
+                batch, seen, previous = [], set(), seen
+        if batch:
+            yield self.exclude_existing(batch)
+
+    def exclude_existing(self, batch):
+        # everything but the previous batch is committed by now
+        taken_usernames = set(
+            User.objects.filter(
+                username__in=[row["username"] for _, row in batch]
+            ).values_list("username", flat=True)
+        )
+        taken_emails = set(
+            Profile.objects.filter(
+                email_lower__in=[
+                    email_key(row["email"]) for _, row in batch if row["email"]
+                ]
+            ).values_list("email_lower", flat=True)
+        )
+        fresh = []
+        for line, row in batch:
+            if row["username"] in taken_usernames:
+                self.skip(line, f"username {row['username']} already exists")
+            elif row["email"] and email_key(row["email"]) in taken_emails:
+                self.skip(line, f"email {row['email']} already exists")
+            else:
+                fresh.append((line, row))
+        return fresh
+
+    def hash_batch(self, pool, batch):
+        passwords = [row["password"] for _, row in batch]
+        if pool is None:
+            return map(hash_password, passwords)
+        chunksize = max(1, len(passwords) // (self.options["workers"] * 4))
+        return pool.map(hash_password, passwords, chunksize=chunksize)
+
+    def insert(self, batch, hashing, started):
+        if not batch:
+            return
+        users = [
+            User(
+                username=row["username"],
+                email=row["email"],
+                first_name=row["first_name"],
+                last_name=row["last_name"],
+                password=password,
+            )
+            for (_, row), password in zip(batch, hashing)
+        ]
+        bios = {row["username"]: row["bio"] for _, row in batch}
+
+        # bulk_create sends no post_save, so the profile and its email copy
+        # from users.signals are created here, and avatars stay on the
+        # default image, which needs no processing
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            # SQLite does not return the new primary keys from bulk_create
+            created = User.objects.filter(username__in=bios).values_list(
+                "pk", "username", "email"
+            )
+            Profile.objects.bulk_create(
+                Profile(user_id=pk, bio=bios[username], email_lower=email_key(email))
+                for pk, username, email in created
+            )
+
+        for user in users:
+            add_user(user.username, user.email)
+        # with DEBUG on, the logged INSERTs would otherwise pile up
+        reset_queries()
+        self.stats["created"] += len(users)
+        self.report(started)
+
+    def report(self, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f"{self.stats['created']} users in {elapsed:.1f}s, "
+            f"{self.stats['created'] / elapsed:.0f} rows/s"
+        )
@@ -0,0 +1,56 @@
+import glob
+import io
+import os
+import pstats
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from users.profiling import SavedProfile, profile_dir
+
+
+class Command(BaseCommand):
+    help = "Aggregate the saved request profiles and print the hottest functions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "views", nargs="*", help="View names to report on, all of them by default"
+        )
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument(
+            "--sort",
+            default="cumulative",
+            choices=["cumulative", "tottime", "calls", "ncalls"],
+        )
+
+    def handle(self, *args, **options):
+        if options["views"]:
+            directories = [profile_dir(view) for view in options["views"]]
+        else:
+            directories = sorted(glob.glob(os.path.join(settings.PROFILE_DIR, "*")))
+
+        found = False
+        for directory in directories:
+            paths = sorted(glob.glob(os.path.join(directory, "*.prof.gz")))
+            if not paths:
+                continue
+            found = True
+
+            # file names carry the wall time of each request
+            elapsed = sorted(
+                int(os.path.basename(path).split("-")[1][:-2]) for path in paths
+            )
+            self.stdout.write(
+                f"== {os.path.basename(directory)}: {len(paths)} profiles, "
+                f"median {elapsed[len(elapsed) // 2]} ms, max {elapsed[-1]} ms"
+            )
+
+            output = io.StringIO()
+            stats = pstats.Stats(SavedProfile(paths[0]), stream=output)
+            for path in paths[1:]:
+                stats.add(SavedProfile(path))
+            stats.sort_stats(options["sort"]).print_stats(options["limit"])
+            self.stdout.write(output.getvalue())
+
+        if not found:
+            raise CommandError(f"No profiles found in {settings.PROFILE_DIR}")
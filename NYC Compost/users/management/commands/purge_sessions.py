@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from users.sessions.purge import purge_expired_sessions, uses_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions in small batches without locking the database for long"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--pause", type=float, default=0.05, help="Seconds to sleep between batches"
+        )
+        parser.add_argument(
+            "--time-budget",
+            type=float,
+            default=None,
+            help="Stop after this many seconds, the next run continues the purge",
+        )
+
+    def handle(self, *args, **options):
+        if not uses_database():
+            self.stdout.write("The session engine keeps no sessions in the database")
+            return
+
+        deleted = purge_expired_sessions(
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            time_budget=options["time_budget"],
+        )
+        self.stdout.write(f"Deleted {deleted} expired sessions")
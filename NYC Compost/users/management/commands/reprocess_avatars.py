@@ -0,0 +1,188 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from users.backends import invalidate_cached_users
+from users.images import generate_variants, process_avatar
+from users.models import DEFAULT_AVATAR, Profile, avatar_storage, variant_targets
+
+# times a chunk is handed to a new pool after a child process died
+MAX_POOL_RESTARTS = 2
+
+
+class Command(BaseCommand):
+    help = "Regenerate avatar variants for every profile, resuming where the last run stopped"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Size of the process pool, 0 processes avatars inline",
+        )
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--checkpoint",
+            default=os.path.join(settings.BASE_DIR, ".reprocess_avatars.json"),
+        )
+        parser.add_argument(
+            "--restart", action="store_true", help="Ignore an existing checkpoint"
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild variants that already exist",
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        state = {"last_pk": 0, "processed": 0, "failed": 0, "failed_pks": []}
+        if not options["restart"] and os.path.exists(options["checkpoint"]):
+            with open(options["checkpoint"]) as f:
+                state.update(json.load(f))
+            self.stdout.write(
+                f"Resuming after profile {state['last_pk']}, retrying "
+                f"{len(state['failed_pks'])} failed profiles"
+            )
+
+        if avatar_storage.exists(DEFAULT_AVATAR):
+            generate_variants(
+                avatar_storage.path(DEFAULT_AVATAR),
+                variant_targets(DEFAULT_AVATAR),
+                force=options["force"],
+            )
+
+        # profiles that failed before the last checkpoint are tried again
+        rows = (
+            Profile.objects.filter(
+                Q(pk__gt=state["last_pk"]) | Q(pk__in=state["failed_pks"])
+            )
+            .exclude(avatar=DEFAULT_AVATAR)
+            .order_by("pk")
+            .values_list("pk", "avatar")
+            .iterator(chunk_size=options["chunk_size"])
+        )
+
+        self.pool = None
+        if options["workers"]:
+            self.pool = ProcessPoolExecutor(max_workers=options["workers"])
+
+        started = time.monotonic()
+        processed = 0
+        chunk = []
+        try:
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == options["chunk_size"]:
+                    processed += self.process_chunk(chunk, state)
+                    self.report(processed, started)
+                    chunk = []
+            if chunk:
+                processed += self.process_chunk(chunk, state)
+                self.report(processed, started)
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+
+        self.stdout.write(
+            f"Done: {state['processed']} avatars processed, {state['failed']} failed"
+        )
+        # a finished run starts over next time, which also retries its failures
+        if os.path.exists(options["checkpoint"]):
+            os.remove(options["checkpoint"])
+
+    def run_pool(self, args):
+        # returns the failures and the names a broken pool never finished
+        failed, broken = [], []
+        try:
+            futures = {
+                self.pool.submit(process_avatar, *a): name for name, a in args.items()
+            }
+        except BrokenProcessPool:
+            return failed, list(args)
+        wait(futures)
+        for future, name in futures.items():
+            error = future.exception()
+            if isinstance(error, BrokenProcessPool):
+                broken.append(name)
+            elif error is not None:
+                failed.append((name, error))
+        return failed, broken
+
+    def process_chunk(self, chunk, state):
+        # profiles sharing a content-addressed upload only need it done once
+        by_name = {}
+        for pk, name in chunk:
+            by_name.setdefault(name, []).append(pk)
+
+        args = {
+            name: (
+                avatar_storage.path(name),
+                variant_targets(name),
+                settings.AVATAR_MAX_UPLOAD_BYTES,
+                settings.AVATAR_MAX_PIXELS,
+                self.options["force"],
+            )
+            for name in by_name
+        }
+
+        failed = []
+        if self.pool is None:
+            for name, name_args in args.items():
+                try:
+                    process_avatar(*name_args)
+                except Exception as error:
+                    failed.append((name, error))
+        else:
+            # a child that dies takes the pool with it; the images it did not
+            # finish are run again in a new pool, and only count as failed
+            # if they keep breaking it
+            for attempt in range(MAX_POOL_RESTARTS + 1):
+                pool_failed, broken = self.run_pool(args)
+                failed += pool_failed
+                if not broken:
+                    break
+                self.stderr.write("Process pool broke, restarting it")
+                self.pool.shutdown(wait=False)
+                self.pool = ProcessPoolExecutor(max_workers=self.options["workers"])
+                args = {name: args[name] for name in broken}
+            else:
+                failed += [(name, BrokenProcessPool("worker died")) for name in broken]
+
+        failed_pks = set(state["failed_pks"]) - {pk for pk, _ in chunk}
+        for name, error in failed:
+            self.stderr.write(f"{name}: {type(error).__name__}: {error}")
+            pks = by_name.pop(name)
+            failed_pks.update(pks)
+            state["failed"] += len(pks)
+
+        ready = [pk for pks in by_name.values() for pk in pks]
+        Profile.objects.filter(pk__in=ready).update(avatar_ready=True)
+        invalidate_cached_users(
+            Profile.objects.filter(pk__in=ready).values_list("user_id", flat=True)
+        )
+
+        # retried profiles sort before the resume point
+        state["last_pk"] = max(state["last_pk"], chunk[-1][0])
+        state["failed_pks"] = sorted(failed_pks)
+        state["processed"] += len(ready)
+        self.save_checkpoint(state)
+        return len(chunk)
+
+    def save_checkpoint(self, state):
+        path = self.options["checkpoint"]
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(f"{path}.tmp", path)
+
+    def report(self, processed, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"{processed} profiles in {elapsed:.1f}s, {processed / elapsed:.1f} images/s"
+        )
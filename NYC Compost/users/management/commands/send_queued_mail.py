@@ -0,0 +1,104 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from users.mail import claim, delivered, outbox_stats, recover, release
+from users.prometheus import EMAIL_DELIVERY_LATENCY, EMAIL_SEND
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver spooled email in batches over a small pool of persistent connections"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=2)
+        parser.add_argument("--batch-size", type=int, default=20)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when no message is due for delivery",
+        )
+        parser.add_argument(
+            "--stats", action="store_true", help="Print the outbox metrics and exit"
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            for key, value in outbox_stats().items():
+                self.stdout.write(f"{key} {value}")
+            return
+
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+        recover(stale_after=300)
+
+        try:
+            with ThreadPoolExecutor(max_workers=options["connections"]) as pool:
+                while True:
+                    claimed = claim(options["batch_size"] * options["connections"])
+                    if not claimed:
+                        if options["once"]:
+                            break
+                        time.sleep(options["poll_interval"])
+                        continue
+
+                    size = options["batch_size"]
+                    batches = [
+                        claimed[i : i + size] for i in range(0, len(claimed), size)
+                    ]
+                    latencies = [
+                        latency
+                        for batch_latencies in pool.map(self.deliver, batches)
+                        for latency in batch_latencies
+                    ]
+                    self.report(len(claimed), latencies)
+        finally:
+            for connection in self.connections:
+                connection.close()
+
+    def connection(self):
+        # each pool thread keeps its own connection open between batches
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = get_connection(settings.EMAIL_OUTBOX_BACKEND)
+            connection.open()
+            self.local.connection = connection
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def deliver(self, batch):
+        latencies = []
+        for name, message in batch:
+            try:
+                with EMAIL_SEND.time(stage="smtp"):
+                    self.connection().send_messages([message])
+            except Exception as error:
+                # the next message gets a fresh connection
+                connection = getattr(self.local, "connection", None)
+                if connection is not None:
+                    connection.close()
+                    self.local.connection = None
+                release(name, error)
+            else:
+                latency = delivered(name)
+                EMAIL_DELIVERY_LATENCY.observe(latency)
+                latencies.append(latency)
+        return latencies
+
+    def report(self, claimed, latencies):
+        stats = outbox_stats()
+        line = f"Sent {len(latencies)} of {claimed} messages"
+        if latencies:
+            line += (
+                f", delivery latency avg {sum(latencies) / len(latencies):.2f}s"
+                f" max {max(latencies):.2f}s"
+            )
+        self.stdout.write(f"{line}, queue depth {stats['queue_depth']}")
@@ -0,0 +1,84 @@
+import base64
+import hashlib
+import os
+import posixpath
+import re
+import urllib.request
+from urllib.parse import urljoin, urlsplit
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from users.assets import VENDOR_ASSETS
+
+CSS_URL = re.compile(r"""url\(\s*['"]?([^'")]+)['"]?\s*\)""")
+
+
+def integrity(data):
+    return "sha384-" + base64.b64encode(hashlib.sha384(data).digest()).decode()
+
+
+class Command(BaseCommand):
+    help = "Download the pinned front-end libraries into users/static/vendor"
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help="Assets to fetch, default all")
+        parser.add_argument(
+            "--force", action="store_true", help="Download files that already exist"
+        )
+        parser.add_argument("--timeout", type=float, default=30)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.static_dir = os.path.join(apps.get_app_config("users").path, "static")
+        unknown = set(options["names"]) - set(VENDOR_ASSETS)
+        if unknown:
+            raise CommandError(f"Unknown assets: {', '.join(sorted(unknown))}")
+
+        for name in options["names"] or VENDOR_ASSETS:
+            asset = VENDOR_ASSETS[name]
+            data = self.fetch(asset["url"], asset["path"])
+            if data is None:
+                continue
+            if integrity(data) != asset["integrity"]:
+                raise CommandError(
+                    f"{asset['url']} does not match its integrity hash, "
+                    f"got {integrity(data)}"
+                )
+            self.write(asset["path"], data)
+            if name.endswith(".css"):
+                self.fetch_references(asset["url"], asset["path"], data)
+
+    def fetch(self, url, path):
+        if os.path.exists(os.path.join(self.static_dir, path)):
+            if not self.options["force"]:
+                self.stdout.write(f"{path} already exists")
+                return None
+        try:
+            with urllib.request.urlopen(url, timeout=self.options["timeout"]) as r:
+                return r.read()
+        except OSError as e:
+            raise CommandError(f"Could not download {url}: {e}")
+
+    def write(self, path, data):
+        destination = os.path.join(self.static_dir, path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        with open(destination, "wb") as f:
+            f.write(data)
+        self.stdout.write(f"{path} ({len(data)} bytes)")
+
+    def fetch_references(self, url, path, css):
+        # fonts and images a stylesheet points to are kept at the same
+        # relative location, so the url() references keep working
+        for reference in sorted(set(CSS_URL.findall(css.decode()))):
+            if reference.startswith(("data:", "#")) or urlsplit(reference).scheme:
+                continue
+            reference = reference.split("?")[0].split("#")[0]
+            target = posixpath.normpath(
+                posixpath.join(posixpath.dirname(path), reference)
+            )
+            if not target.startswith("vendor/"):
+                raise CommandError(f"{url} refers to {reference} outside vendor/")
+            data = self.fetch(urljoin(url, reference), target)
+            if data is not None:
+                self.write(target, data)
@@ -0,0 +1,191 @@
+import hashlib
+import mimetypes
+import os
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .images import VARIANT_EXTENSIONS
+
+# uploads are named after the SHA-256 of their content; their variants keep
+# the hash but are rewritten in place by `reprocess_avatars --force`, so only
+# the uploads themselves can be cached forever
+HASHED_NAME_RE = re.compile(r"^(?P<hash>[0-9a-f]{64})\.\w+$")
+VARIANT_PATH_RE = re.compile(r"^profile_images/variants/[\w-]+-\d+\.jpg$")
+RANGE_RE = re.compile(r"^bytes=(?P<start>\d*)-(?P<end>\d*)$")
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=3600"
+
+
+@lru_cache(maxsize=1024)
+def _file_digest(path, size, mtime):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _etag(path, stat):
+    if HASHED_NAME_RE.match(os.path.basename(path)):
+        return '"%s"' % os.path.basename(path)
+    return '"%s"' % _file_digest(path, stat.st_size, stat.st_mtime_ns)
+
+
+def _accepted_formats(request):
+    accepted = set()
+    for item in request.META.get("HTTP_ACCEPT", "").split(","):
+        media_type, *params = item.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    pass
+        if quality > 0:
+            accepted.add(media_type.strip().lower())
+    return accepted
+
+
+def _negotiate(request, path):
+    # variants are linked as JPEG and swapped for the smallest generated file
+    # in a format the browser accepts
+    accepted = _accepted_formats(request)
+    base = os.path.splitext(path)[0]
+    best, best_size = path, None
+    for extension in VARIANT_EXTENSIONS:
+        if extension != "jpg" and f"image/{extension}" not in accepted:
+            continue
+        candidate = f"{base}.{extension}"
+        try:
+            size = os.path.getsize(safe_join(settings.MEDIA_ROOT, candidate))
+        except OSError:
+            continue
+        if best_size is None or size < best_size:
+            best, best_size = candidate, size
+    return best
+
+
+def _byte_range(request, etag, size):
+    header = request.META.get("HTTP_RANGE")
+    if not header:
+        return None
+    # a range for an older version of the file means the whole file is wanted
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if if_range and if_range != etag:
+        return None
+
+    match = RANGE_RE.match(header.strip())
+    if not match or not (match["start"] or match["end"]):
+        return None
+
+    if match["start"]:
+        start = int(match["start"])
+        end = min(int(match["end"]), size - 1) if match["end"] else size - 1
+    else:
+        start = max(size - int(match["end"]), 0)
+        end = size - 1
+
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def _stream(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    negotiated = VARIANT_PATH_RE.match(path) is not None
+    try:
+        if negotiated:
+            path = _negotiate(request, path)
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Media file not found")
+
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404("Media file not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Media file not found")
+
+    etag = _etag(full_path, stat)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": (
+            IMMUTABLE if HASHED_NAME_RE.match(os.path.basename(path)) else REVALIDATE
+        ),
+        "Accept-Ranges": "bytes",
+    }
+    if negotiated:
+        headers["Vary"] = "Accept"
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        response = _file_response(request, path, full_path, etag, stat.st_size)
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def _file_response(request, path, full_path, etag, size):
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+
+    # the front-end server streams the file and answers range requests itself
+    sendfile_header = settings.MEDIA_SENDFILE_HEADER
+    if sendfile_header:
+        response = HttpResponse(content_type=content_type)
+        if sendfile_header.lower() == "x-accel-redirect":
+            response[sendfile_header] = settings.MEDIA_SENDFILE_PREFIX + path
+        else:
+            response[sendfile_header] = full_path
+        return response
+
+    try:
+        byte_range = _byte_range(request, etag, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        response = StreamingHttpResponse(
+            _stream(full_path, 0, size), content_type=content_type
+        )
+        response["Content-Length"] = size
+        return response
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _stream(full_path, start, end - start + 1),
+        status=206,
+        content_type=content_type,
+    )
+    response["Content-Length"] = end - start + 1
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
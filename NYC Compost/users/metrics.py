@@ -0,0 +1,139 @@
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.http import JsonResponse
+from django.template.backends import django as django_backend
+
+from .prometheus import DB_QUERY_DURATION, REQUEST_DURATION, REQUESTS
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("queries", "sql_ms", "template_ms", "total_ms")
+
+_local = threading.local()
+_views = {}
+_views_lock = threading.Lock()
+
+
+def _current():
+    return getattr(_local, "sample", None)
+
+
+def record(view_name, sample):
+    with _views_lock:
+        stats = _views.setdefault(view_name, {"requests": 0})
+        stats["requests"] += 1
+        for field in FIELDS:
+            stats[f"{field}_total"] = stats.get(f"{field}_total", 0) + sample[field]
+            stats[f"{field}_max"] = max(stats.get(f"{field}_max", 0), sample[field])
+
+
+def view_stats():
+    with _views_lock:
+        return {name: dict(stats) for name, stats in _views.items()}
+
+
+def reset_view_stats():
+    with _views_lock:
+        _views.clear()
+
+
+def over_budget(sample):
+    budget = settings.REQUEST_BUDGETS.get(sample["view"], {})
+    return {
+        field: (sample[field], limit)
+        for field, limit in budget.items()
+        if sample[field] > limit
+    }
+
+
+def _time_query(execute, sql, params, many, context):
+    begin = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - begin
+        DB_QUERY_DURATION.observe(elapsed, alias=context["connection"].alias)
+        sample = _current()
+        if sample is not None:
+            sample["queries"] += 1
+            sample["sql_ms"] += elapsed * 1000
+
+
+class RequestMetricsMiddleware:
+    # counts queries on every database alias, including replicas
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample = {field: 0 for field in FIELDS}
+        _local.sample = sample
+        begin = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_time_query))
+                response = self.get_response(request)
+        finally:
+            _local.sample = None
+        sample["total_ms"] = (time.perf_counter() - begin) * 1000
+
+        match = request.resolver_match
+        sample["view"] = match.view_name if match else "unresolved"
+        sample["method"] = request.method
+        sample["status"] = response.status_code
+        record(sample["view"], sample)
+        REQUESTS.inc(
+            view=sample["view"], method=request.method, status=str(response.status_code)
+        )
+        REQUEST_DURATION.observe(sample["total_ms"] / 1000, view=sample["view"])
+
+        # the test client picks this up to check REQUEST_BUDGETS
+        response.request_metrics = sample
+        line = {
+            key: round(value, 2) if isinstance(value, float) else value
+            for key, value in sample.items()
+        }
+        exceeded = over_budget(sample)
+        if exceeded:
+            logger.warning(json.dumps({**line, "over_budget": sorted(exceeded)}))
+        else:
+            logger.info(json.dumps(line))
+        return response
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        begin = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            sample = _current()
+            if sample is not None:
+                sample["template_ms"] += (time.perf_counter() - begin) * 1000
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    # times whole renders; includes and extends happen inside them
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+@staff_member_required
+def view_metrics(request):
+    return JsonResponse(view_stats())
@@ -0,0 +1,27 @@
+# Generated by Django 3.2 on 2026-10-18 02:25
+
+from django.db import migrations, models
+import users.storage
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0005_avatarjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="avatar_ready",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name="profile",
+            name="avatar",
+            field=models.ImageField(
+                default="default.jpg",
+                storage=users.storage.HashedFileSystemStorage(),
+                upload_to="profile_images",
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0006_profile_avatar_variants"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="avatarjob",
+            name="peak_rss",
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2 on 2026-10-18 02:42
+
+from django.db import migrations, models
+
+
+def fill_email_lower(apps, schema_editor):
+    Profile = apps.get_model("users", "Profile")
+    db_alias = schema_editor.connection.alias
+
+    batch = []
+    profiles = Profile.objects.using(db_alias).select_related("user")
+    for profile in profiles.iterator(chunk_size=2000):
+        profile.email_lower = (profile.user.email or "").strip().lower()
+        batch.append(profile)
+        if len(batch) >= 2000:
+            Profile.objects.using(db_alias).bulk_update(batch, ["email_lower"])
+            batch = []
+    Profile.objects.using(db_alias).bulk_update(batch, ["email_lower"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0007_avatarjob_peak_rss"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="email_lower",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=254
+            ),
+        ),
+        migrations.RunPython(fill_email_lower, migrations.RunPython.noop),
+    ]
@@ -1,25 +1,200 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
-from PIL import Image
+from django.utils import timezone
+
+from .images import process_avatar, variant_name
+from .prometheus import AVATAR_PROCESSING
+from .storage import HashedFileSystemStorage
+
+DEFAULT_AVATAR = "default.jpg"
+
+avatar_storage = HashedFileSystemStorage()
+_default_variants_ready = False
+
+
+def variant_key(name):
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def variant_sizes():
+    return sorted(set(settings.AVATAR_VARIANTS.values()))
+
+
+def variant_targets(name):
+    key = variant_key(name)
+    return [
+        (size, avatar_storage.path(variant_name(key, size))) for size in variant_sizes()
+    ]
+
+
+def default_variants_ready():
+    # the shared default is processed once by the avatar worker
+    global _default_variants_ready
+    if not _default_variants_ready:
+        _default_variants_ready = all(
+            os.path.exists(path) for _, path in variant_targets(DEFAULT_AVATAR)
+        )
+    return _default_variants_ready
+
+
+def email_key(email):
+    return (email or "").strip().lower()
 
 
 # Extending User Model Using a One-To-One Link
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
 
-    avatar = models.ImageField(default="default.jpg", upload_to="profile_images")
+    avatar = models.ImageField(
+        default=DEFAULT_AVATAR, upload_to="profile_images", storage=avatar_storage
+    )
+    avatar_ready = models.BooleanField(default=False)
     bio = models.TextField()
+    # copy of user.email kept by users.signals, auth_user.email has no index
+    email_lower = models.CharField(
+        max_length=254, blank=True, db_index=True, editable=False
+    )
+
+    # fields compared against their loaded values to skip redundant saves
+    tracked_fields = ("avatar", "bio", "email_lower")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._reset_tracking()
 
     def __str__(self):
         return self.user.username
 
-    # resizing images
+    def _tracked_value(self, name):
+        value = getattr(self, name)
+        return getattr(value, "name", value)
+
+    def _reset_tracking(self):
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            name: self._tracked_value(name)
+            for name in self.tracked_fields
+            if name not in deferred
+        }
+
+    def changed_fields(self):
+        changed = {
+            name
+            for name, value in self._loaded_values.items()
+            if self._tracked_value(name) != value
+        }
+        # a new upload can reuse the name of the file it replaces
+        if "avatar" in self._loaded_values and not self.avatar._committed:
+            changed.add("avatar")
+        return changed
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._reset_tracking()
+
+    @property
+    def has_variants(self):
+        if self.avatar.name == DEFAULT_AVATAR:
+            return default_variants_ready()
+        return self.avatar_ready
+
+    # the original upload is shown until its variants have been generated
+    def avatar_variant_url(self, use="profile"):
+        if not self.has_variants:
+            return self.avatar.url
+        size = settings.AVATAR_VARIANTS[use]
+        return avatar_storage.url(variant_name(variant_key(self.avatar.name), size))
+
+    @property
+    def avatar_src(self):
+        return self.avatar_variant_url("profile")
+
+    @property
+    def avatar_srcset(self):
+        if not self.has_variants:
+            return ""
+        key = variant_key(self.avatar.name)
+        return ", ".join(
+            f"{avatar_storage.url(variant_name(key, size))} {size}w"
+            for size in variant_sizes()
+        )
+
+    # generating variants, in the avatar worker unless processing is synchronous
     def save(self, *args, **kwargs):
-        super().save()
+        avatar_changed = self._state.adding or "avatar" in self.changed_fields()
+        if avatar_changed:
+            self.avatar_ready = False
+        super().save(*args, **kwargs)
+        self._reset_tracking()
+
+        if not avatar_changed or self.avatar.name == DEFAULT_AVATAR:
+            return
+
+        if settings.AVATAR_ASYNC_PROCESSING:
+            AvatarJob.enqueue(self)
+        else:
+            with AVATAR_PROCESSING.time(mode="sync"):
+                process_avatar(
+                    self.avatar.path,
+                    variant_targets(self.avatar.name),
+                    max_bytes=settings.AVATAR_MAX_UPLOAD_BYTES,
+                    max_pixels=settings.AVATAR_MAX_PIXELS,
+                )
+            Profile.objects.filter(pk=self.pk).update(avatar_ready=True)
+            self.avatar_ready = True
+
+
+# Queue of avatar uploads waiting for `manage.py avatar_worker`
+class AvatarJob(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="avatar_jobs"
+    )
+    name = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    peak_rss = models.PositiveBigIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["run_after", "pk"]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+    @classmethod
+    def enqueue(cls, profile):
+        # an upload that is already waiting does not need a second job
+        job, _ = cls.objects.get_or_create(
+            profile=profile, name=profile.avatar.name, status=cls.PENDING
+        )
+        return job
 
-        img = Image.open(self.avatar.path)
+    @property
+    def path(self):
+        return avatar_storage.path(self.name)
 
-        if img.height > 100 or img.width > 100:
-            new_img = (100, 100)
-            img.thumbnail(new_img)
-            img.save(self.avatar.path)
+    def retry_delay(self):
+        return timedelta(
+            seconds=settings.AVATAR_JOB_RETRY_DELAY * 2 ** (self.attempts - 1)
+        )
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.urls import Resolver404, resolve
+
+from .prometheus import Counter
+from .template_cache import TEMPLATE_DIR
+
+CSRF_INPUT = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+CSRF_PLACEHOLDER = b"__csrf_token__"
+
+PAGE_CACHE_REQUESTS = Counter(
+    "page_cache_requests_total",
+    "Anonymous page cache lookups by view and result (hit, miss or bypass).",
+    ("view", "result"),
+)
+
+_version = (0, None)
+_version_lock = threading.Lock()
+
+
+def template_version():
+    # the newest template mtime, looked at no more than once a second
+    global _version
+    checked, version = _version
+    if time.monotonic() - checked > 1:
+        with _version_lock:
+            mtimes = sorted(
+                (name, os.stat(os.path.join(root, name)).st_mtime_ns)
+                for root, _, files in os.walk(TEMPLATE_DIR)
+                for name in files
+            )
+            version = hashlib.md5(repr(mtimes).encode()).hexdigest()[:12]
+            _version = (time.monotonic(), version)
+    return version
+
+
+def cache_key(request):
+    version = settings.DEPLOY_ID or template_version()
+    return "page:%s:%s:%s" % (
+        version,
+        request.method == "HEAD" and "GET" or request.method,
+        hashlib.md5(request.get_full_path().encode()).hexdigest(),
+    )
+
+
+def clear_page_cache():
+    caches[settings.PAGE_CACHE_ALIAS].clear()
+
+
+class PageCacheMiddleware:
+    # the pages in PAGE_CACHE_VIEWS are the same for every anonymous visitor
+    # but for the CSRF token, so they are rendered once and the token is
+    # swapped in on the way out. Visitors with a session or flash messages
+    # skip the cache, so a hit never loads a session or a user.
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        view_name = self.cacheable_view(request)
+        if view_name is None:
+            return self.get_response(request)
+        if (
+            settings.SESSION_COOKIE_NAME in request.COOKIES
+            or CookieStorage.cookie_name in request.COOKIES
+        ):
+            PAGE_CACHE_REQUESTS.inc(view=view_name, result="bypass")
+            return self.get_response(request)
+
+        cache = caches[settings.PAGE_CACHE_ALIAS]
+        key = cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            PAGE_CACHE_REQUESTS.inc(view=view_name, result="hit")
+            headers, content = cached
+            response = HttpResponse(
+                content.replace(CSRF_PLACEHOLDER, get_token(request).encode())
+            )
+            for header, value in headers:
+                response[header] = value
+            response["X-Page-Cache"] = "hit"
+            return response
+
+        PAGE_CACHE_REQUESTS.inc(view=view_name, result="miss")
+        response = self.get_response(request)
+        if self.storable(request, response):
+            content = CSRF_INPUT.sub(
+                rb"\1" + CSRF_PLACEHOLDER + rb"\2", response.content
+            )
+            # headers such as never_cache's Cache-Control still reach the
+            # browser, the outer middleware add the rest on every response
+            headers = [
+                (header, value)
+                for header, value in response.items()
+                if header.lower() != "content-length"
+            ]
+            cache.set(key, (headers, content), settings.PAGE_CACHE_TIMEOUT)
+            response["X-Page-Cache"] = "miss"
+        return response
+
+    def cacheable_view(self, request):
+        if request.method not in ("GET", "HEAD") or not settings.PAGE_CACHE_VIEWS:
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        if match.view_name not in settings.PAGE_CACHE_VIEWS:
+            return None
+        # hits never reach the handler, which would otherwise set this
+        request.resolver_match = match
+        return match.view_name
+
+    def storable(self, request, response):
+        session = getattr(request, "session", None)
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and response["Content-Type"].startswith("text/html")
+            and not (session is not None and session.modified)
+            and all(name == settings.CSRF_COOKIE_NAME for name in response.cookies)
+        )
@@ -0,0 +1,107 @@
+import cProfile
+import glob
+import gzip
+import marshal
+import os
+import random
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+
+def profile_rate(view_name):
+    return settings.PROFILE_VIEW_RATES.get(view_name, settings.PROFILE_SAMPLE_RATE)
+
+
+def profile_dir(view_name):
+    # view names like "admin:index" or "social:begin" become directory names
+    return os.path.join(settings.PROFILE_DIR, re.sub(r"[^\w.-]", "_", view_name))
+
+
+def save_profile(view_name, stats, elapsed):
+    directory = profile_dir(view_name)
+    os.makedirs(directory, exist_ok=True)
+    name = f"{time.time():.0f}-{elapsed * 1000:.0f}ms-{uuid.uuid4().hex[:8]}.prof.gz"
+
+    tmp = os.path.join(directory, f".{name}")
+    with gzip.open(tmp, "wb") as f:
+        marshal.dump(stats, f)
+    os.replace(tmp, os.path.join(directory, name))
+
+    # only the newest PROFILE_KEEP profiles of each view are kept
+    profiles = sorted(
+        glob.glob(os.path.join(directory, "*.prof.gz")), key=os.path.getmtime
+    )
+    for path in profiles[: -settings.PROFILE_KEEP]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class SavedProfile:
+    # what pstats.Stats expects from a profiler: create_stats() and .stats
+    def __init__(self, path):
+        self.path = path
+
+    def create_stats(self):
+        with gzip.open(self.path, "rb") as f:
+            self.stats = marshal.load(f)
+
+
+class ProfilingMiddleware:
+    # profiles PROFILE_SAMPLE_RATE of requests, per view rates from
+    # PROFILE_VIEW_RATES, and any request sending PROFILE_TOKEN in the
+    # X-Profile header
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def view_name(self, request):
+        try:
+            return resolve(request.path_info).view_name
+        except Resolver404:
+            return "unresolved"
+
+    def sampled_view(self, request):
+        # the view name of a request to profile, None otherwise; the URL is
+        # only resolved when a per view rate needs it or the request is
+        # profiled, so the default configuration costs nothing
+        token = request.headers.get("X-Profile")
+        if token and settings.PROFILE_TOKEN and token == settings.PROFILE_TOKEN:
+            return self.view_name(request)
+
+        if not settings.PROFILE_VIEW_RATES:
+            rate = settings.PROFILE_SAMPLE_RATE
+            if rate > 0 and random.random() < rate:
+                return self.view_name(request)
+            return None
+
+        view_name = self.view_name(request)
+        rate = profile_rate(view_name)
+        return view_name if rate > 0 and random.random() < rate else None
+
+    def __call__(self, request):
+        view_name = self.sampled_view(request)
+        if view_name is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiler is already running on this thread
+            return self.get_response(request)
+
+        begin = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        elapsed = time.perf_counter() - begin
+
+        profiler.create_stats()
+        save_profile(view_name, profiler.stats, elapsed)
+        return response
@@ -0,0 +1,300 @@
+import bisect
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+INITIAL_SIZE = 64 * 1024
+
+_families = []
+
+
+def _encode(name, suffix, labels):
+    return json.dumps([name, suffix, sorted(labels.items())])
+
+
+def _entries(data):
+    # header: bytes in use; entries: key length, key, padding, 8-byte double
+    used = struct.unpack_from("I", data, 0)[0]
+    pos = 8
+    while pos < used:
+        length = struct.unpack_from("I", data, pos)[0]
+        key = bytes(data[pos + 4 : pos + 4 + length]).decode()
+        value_pos = pos + (4 + length + 7) // 8 * 8
+        yield key, struct.unpack_from("d", data, value_pos)[0], value_pos
+        pos = value_pos + 8
+
+
+class MemoryStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def add(self, items):
+        with self.lock:
+            for key, amount in items:
+                self.values[key] = self.values.get(key, 0) + amount
+
+    def collect(self):
+        with self.lock:
+            return dict(self.values)
+
+
+class MmapStore:
+    # one file per process, so processes never contend with each other;
+    # /metrics sums the files of every process that shared the directory
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.fd = os.open(
+            os.path.join(directory, f"{os.getpid()}.db"), os.O_RDWR | os.O_CREAT
+        )
+        size = os.fstat(self.fd).st_size
+        if size == 0:
+            os.ftruncate(self.fd, INITIAL_SIZE)
+        self.map = mmap.mmap(self.fd, max(size, INITIAL_SIZE))
+        if size == 0:
+            struct.pack_into("I", self.map, 0, 8)
+        self.positions = {key: pos for key, _, pos in _entries(self.map)}
+
+    def _allocate(self, key):
+        encoded = key.encode()
+        used = struct.unpack_from("I", self.map, 0)[0]
+        value_pos = used + (4 + len(encoded) + 7) // 8 * 8
+        if value_pos + 8 > len(self.map):
+            capacity = len(self.map) * 2
+            while value_pos + 8 > capacity:
+                capacity *= 2
+            os.ftruncate(self.fd, capacity)
+            self.map.close()
+            self.map = mmap.mmap(self.fd, capacity)
+
+        struct.pack_into("I", self.map, used, len(encoded))
+        self.map[used + 4 : used + 4 + len(encoded)] = encoded
+        struct.pack_into("d", self.map, value_pos, 0.0)
+        # readers only look at entries below the header
+        struct.pack_into("I", self.map, 0, value_pos + 8)
+        self.positions[key] = value_pos
+        return value_pos
+
+    def add(self, items):
+        with self.lock:
+            for key, amount in items:
+                pos = self.positions.get(key)
+                if pos is None:
+                    pos = self._allocate(key)
+                value = struct.unpack_from("d", self.map, pos)[0]
+                struct.pack_into("d", self.map, pos, value + amount)
+
+    def collect(self):
+        values = {}
+        for path in glob.glob(os.path.join(self.directory, "*.db")):
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < 8:
+                continue
+            for key, value, _ in _entries(data):
+                values[key] = values.get(key, 0) + value
+        return values
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def store():
+    # forked workers get their own file
+    global _store, _store_pid
+    if _store_pid != os.getpid():
+        with _store_lock:
+            if _store_pid != os.getpid():
+                if settings.METRICS_DIR:
+                    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+                    _store = MmapStore(settings.METRICS_DIR)
+                else:
+                    _store = MemoryStore()
+                _store_pid = os.getpid()
+    return _store
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        _families.append(self)
+
+    def inc(self, amount=1, **labels):
+        if settings.METRICS_ENABLED:
+            store().add([(_encode(self.name, "", labels), amount)])
+
+
+class Histogram(Counter):
+    type = "histogram"
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=None):
+        super().__init__(name, documentation, labelnames)
+        if buckets is not None:
+            self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if not settings.METRICS_ENABLED:
+            return
+        # buckets are stored apart and added up when exposed
+        index = bisect.bisect_left(self.buckets, value)
+        le = str(self.buckets[index]) if index < len(self.buckets) else "+Inf"
+        store().add(
+            [
+                (_encode(self.name, "_bucket", {**labels, "le": le}), 1),
+                (_encode(self.name, "_sum", labels), value),
+            ]
+        )
+
+    @contextmanager
+    def time(self, **labels):
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - begin, **labels)
+
+
+class Gauge:
+    type = "gauge"
+
+    # read from function when scraped instead of stored, so every process
+    # reports the same value
+    def __init__(self, name, documentation, function):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        _families.append(self)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"),
+        )
+        for name, value in labels
+    )
+    return "{%s}" % pairs
+
+
+def _format(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def exposition():
+    samples = {}
+    for key, value in store().collect().items():
+        name, suffix, labels = json.loads(key)
+        samples.setdefault(name, []).append((suffix, dict(labels), value))
+
+    lines = []
+    for family in _families:
+        lines.append(f"# HELP {family.name} {family.documentation}")
+        lines.append(f"# TYPE {family.name} {family.type}")
+        family_samples = samples.get(family.name, [])
+
+        if family.type == "gauge":
+            lines.append(f"{family.name} {_format(family.function())}")
+            continue
+
+        if family.type == "counter":
+            for _, labels, value in sorted(family_samples, key=repr):
+                lines.append(
+                    f"{family.name}{_labels(sorted(labels.items()))} {_format(value)}"
+                )
+            continue
+
+        series = {}
+        for suffix, labels, value in family_samples:
+            le = labels.pop("le", None)
+            entry = series.setdefault(tuple(sorted(labels.items())), [{}, 0])
+            if suffix == "_bucket":
+                entry[0][le] = value
+            else:
+                entry[1] = value
+
+        for labels, (buckets, total) in sorted(series.items()):
+            cumulative = 0
+            for bound in [str(b) for b in family.buckets] + ["+Inf"]:
+                cumulative += buckets.get(bound, 0)
+                lines.append(
+                    f"{family.name}_bucket{_labels(labels + (('le', bound),))} "
+                    f"{_format(cumulative)}"
+                )
+            lines.append(f"{family.name}_sum{_labels(labels)} {_format(total)}")
+            lines.append(f"{family.name}_count{_labels(labels)} {_format(cumulative)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def metrics(request):
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(exposition(), content_type=CONTENT_TYPE)
+
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "Requests by view, method and status.",
+    ("view", "method", "status"),
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Request latency by view.", ("view",)
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duration of SQL queries run during requests.",
+    ("alias",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+AVATAR_PROCESSING = Histogram(
+    "avatar_processing_seconds",
+    "Time to generate the variants of an avatar.",
+    ("mode",),
+)
+EMAIL_SEND = Histogram(
+    "email_send_seconds", "Time to spool or deliver an email.", ("stage",)
+)
+EMAIL_DELIVERY_LATENCY = Histogram(
+    "email_delivery_latency_seconds",
+    "Time from spooling an email to delivering it, retries included.",
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600),
+)
+
+
+def _outbox_queue_depth():
+    from .mail import outbox_stats
+
+    return outbox_stats()["queue_depth"]
+
+
+EMAIL_OUTBOX_QUEUE_DEPTH = Gauge(
+    "email_outbox_queue_depth",
+    "Messages spooled and waiting for delivery, including those waiting to retry.",
+    _outbox_queue_depth,
+)
+SESSION_STORE = Histogram(
+    "session_store_seconds",
+    "Session store latency by operation.",
+    ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
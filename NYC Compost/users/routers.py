@@ -0,0 +1,72 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_local = threading.local()
+
+
+@contextmanager
+def use_primary():
+    previous = getattr(_local, "primary", False)
+    _local.primary = True
+    try:
+        yield
+    finally:
+        _local.primary = previous
+
+
+def pinned():
+    return getattr(_local, "primary", False)
+
+
+class PrimaryReplicaRouter:
+    def in_transaction(self):
+        return connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+    def db_for_read(self, model, **hints):
+        # reads inside a transaction must see the writes made in it
+        if not settings.DATABASE_REPLICAS or pinned() or self.in_transaction():
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinningMiddleware:
+    # after a client writes, its reads stay on the primary until the
+    # replicas have had time to catch up
+    cookie_name = "pin_primary"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writing = request.method not in ("GET", "HEAD", "OPTIONS", "TRACE")
+        if not settings.DATABASE_REPLICAS or not (
+            writing or self.cookie_name in request.COOKIES
+        ):
+            return self.get_response(request)
+
+        with use_primary():
+            response = self.get_response(request)
+
+        if writing and response.status_code < 400:
+            response.set_cookie(
+                self.cookie_name,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
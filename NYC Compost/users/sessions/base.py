@@ -0,0 +1,64 @@
+import hashlib
+import json
+
+from django.contrib.sessions.backends.base import CreateError
+
+from ..prometheus import SESSION_STORE
+
+
+class WriteSuppressingMixin:
+    # SessionMiddleware saves whenever a key was assigned, even to the value it
+    # already had; this store only writes when the data really changed, and
+    # writes a rotated key once at the end of the request instead of twice
+    def __init__(self, session_key=None):
+        self._loaded_digest = None
+        self._create_pending = False
+        super().__init__(session_key)
+
+    def _digest(self, data):
+        encoded = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha1(encoded.encode()).hexdigest()
+
+    def load(self):
+        with SESSION_STORE.time(operation="load"):
+            data = super().load()
+        self._loaded_digest = self._digest(data)
+        return data
+
+    def cycle_key(self):
+        data = self._session
+        key = self.session_key
+        self._session_key = self._get_new_session_key()
+        self._session_cache = data
+        self._create_pending = True
+        self.modified = True
+        if key:
+            self.delete(key)
+
+    def save(self, must_create=False):
+        with SESSION_STORE.time(operation="save"):
+            self._save_if_changed(must_create)
+
+    def _save_if_changed(self, must_create):
+        data = getattr(self, "_session_cache", None)
+
+        if self._create_pending:
+            while True:
+                try:
+                    super().save(must_create=True)
+                except CreateError:
+                    self._session_key = self._get_new_session_key()
+                    continue
+                self._create_pending = False
+                break
+        elif (
+            must_create
+            or self.session_key is None
+            or data is None
+            or self._digest(data) != self._loaded_digest
+        ):
+            super().save(must_create=must_create)
+        else:
+            return
+
+        self._loaded_digest = self._digest(self._session)
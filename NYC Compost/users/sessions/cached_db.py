@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends import cached_db
+
+from .base import WriteSuppressingMixin
+
+
+class SessionStore(WriteSuppressingMixin, cached_db.SessionStore):
+    pass
@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends import db
+
+from .base import WriteSuppressingMixin
+
+
+class SessionStore(WriteSuppressingMixin, db.SessionStore):
+    pass
@@ -0,0 +1,48 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.utils import timezone
+
+
+def uses_database():
+    engine = import_module(settings.SESSION_ENGINE)
+    return issubclass(engine.SessionStore, DBStore)
+
+
+def purge_expired_sessions(batch_size=500, pause=0.05, time_budget=None):
+    # deletes walk the primary key in small batches, each its own short
+    # transaction, so logins can write between them
+    model = import_module(settings.SESSION_ENGINE).SessionStore.get_model_class()
+    now = timezone.now()
+    deadline = time.monotonic() + time_budget if time_budget else None
+    last_key = ""
+    deleted = 0
+
+    while True:
+        keys = list(
+            model.objects.filter(expire_date__lt=now, session_key__gt=last_key)
+            .order_by("session_key")
+            .values_list("session_key", flat=True)[:batch_size]
+        )
+        if not keys:
+            break
+
+        deleted += model.objects.filter(session_key__in=keys).delete()[0]
+        last_key = keys[-1]
+
+        if len(keys) < batch_size:
+            break
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        time.sleep(pause)
+
+    return deleted
+
+
+def purge_sessions_task():
+    purge_expired_sessions(
+        batch_size=settings.SESSION_PURGE_BATCH_SIZE,
+        time_budget=settings.SESSION_PURGE_TIME_BUDGET,
+    )
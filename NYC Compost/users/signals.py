@@ -1,19 +1,47 @@
-
-
-
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.contrib.auth.models import User
 from django.dispatch import receiver
 
-from .models import Profile
+from .availability import add_user
+from .backends import invalidate_cached_users
+from .models import Profile, email_key
 
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     if created:
-        Profile.objects.create(user=instance)
+        Profile.objects.create(user=instance, email_lower=email_key(instance.email))
+
+
+@receiver(post_save, sender=User)
+def save_profile(sender, instance, created, update_fields=None, **kwargs):
+    email_lower = email_key(instance.email)
+
+    # a profile that was never loaded through this user can only be out of
+    # date on its email copy, and saves like the last_login update that name
+    # their fields leave the profile table alone
+    if not User.profile.related.is_cached(instance):
+        if not created and (update_fields is None or "email" in update_fields):
+            Profile.objects.filter(user=instance).exclude(
+                email_lower=email_lower
+            ).update(email_lower=email_lower)
+        return
+
+    instance.profile.email_lower = email_lower
+    if instance.profile.changed_fields():
+        instance.profile.save()
 
 
 @receiver(post_save, sender=User)
-def save_profile(sender, instance, **kwargs):
-    instance.profile.save()
+def update_availability_filter(sender, instance, **kwargs):
+    add_user(instance.username, instance.email)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    invalidate_cached_users([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_profile_user(sender, instance, **kwargs):
+    invalidate_cached_users([instance.user_id])
@@ -0,0 +1,26 @@
+// Adds a show/hide button after every input marked data-toggle="password"
+document.querySelectorAll('input[data-toggle="password"]').forEach(function (input) {
+    var group = document.createElement("div");
+    group.className = "input-group";
+    input.parentNode.insertBefore(group, input);
+    group.appendChild(input);
+
+    var append = document.createElement("div");
+    append.className = "input-group-append";
+    var button = document.createElement("button");
+    button.type = "button";
+    button.className = "btn btn-outline-secondary";
+    button.title = "Click here to show/hide password";
+    button.setAttribute("aria-label", button.title);
+    var icon = document.createElement("i");
+    icon.className = "fas fa-eye";
+    button.appendChild(icon);
+    append.appendChild(button);
+    group.appendChild(append);
+
+    button.addEventListener("click", function () {
+        var hidden = input.type === "password";
+        input.type = hidden ? "text" : "password";
+        icon.className = hidden ? "fas fa-eye-slash" : "fas fa-eye";
+    });
+});
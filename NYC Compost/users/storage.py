@@ -0,0 +1,67 @@
+import gzip
+import hashlib
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".xml", ".map"}
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class HashedFileSystemStorage(FileSystemStorage):
+    # files are named after their content, so identical uploads share one file
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        name = os.path.join(directory, content_hash(content) + extension)
+
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+def compressed_variants(data):
+    # mtime is fixed so collectstatic is reproducible
+    yield ".gz", gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield ".br", brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # writes .gz and .br copies next to every hashed text file, for the
+    # static layer in users.wsgi_static to send without compressing per request
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # hashed_files holds the final names, after every url() substitution
+        for name in sorted(set(self.hashed_files.values())):
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            with self.open(name) as f:
+                data = f.read()
+            for suffix, compressed in compressed_variants(data):
+                if len(compressed) >= len(data):
+                    continue
+                with open(self.path(name + suffix), "wb") as f:
+                    f.write(compressed)
@@ -0,0 +1,18 @@
+import os
+
+from django.template.loader import get_template
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+
+def warm_templates():
+    # parse every template of this app into the cached loader up front, so
+    # no request pays for it
+    names = sorted(
+        os.path.relpath(os.path.join(root, name), TEMPLATE_DIR)
+        for root, _, files in os.walk(TEMPLATE_DIR)
+        for name in files
+    )
+    for name in names:
+        get_template(name)
+    return names
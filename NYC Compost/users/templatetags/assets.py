@@ -0,0 +1,25 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from ..assets import VENDOR_ASSETS, is_vendored
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_asset(name):
+    asset = VENDOR_ASSETS[name]
+    if is_vendored(name):
+        url, attributes = static(asset["path"]), ""
+    else:
+        url = asset["url"]
+        attributes = (
+            format_html(' integrity="{}" crossorigin="anonymous"', asset["integrity"])
+            if asset["integrity"]
+            else ""
+        )
+
+    if name.endswith(".css"):
+        return format_html('<link rel="stylesheet" href="{}"{}>', url, attributes)
+    return format_html('<script src="{}"{}></script>', url, attributes)
@@ -0,0 +1,49 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, override_settings
+from PIL import Image
+
+from .metrics import over_budget
+
+
+class BudgetClient(Client):
+    # fails the test on any response over its REQUEST_BUDGETS entry
+    def request(self, **request):
+        response = super().request(**request)
+        sample = getattr(response, "request_metrics", None)
+        if sample is not None:
+            exceeded = over_budget(sample)
+            if exceeded:
+                raise AssertionError(
+                    f"{sample['method']} {sample['view']} over budget: "
+                    + ", ".join(
+                        f"{field} {value:g} > {limit:g}"
+                        for field, (value, limit) in sorted(exceeded.items())
+                    )
+                )
+        return response
+
+
+class RequestBudgetMixin:
+    client_class = BudgetClient
+
+
+def make_image(name="avatar.png", color="red", size=(300, 200)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class TemporaryMediaMixin:
+    # points MEDIA_ROOT at a directory of its own, removed after the class
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        media_settings.enable()
+        cls.addClassCleanup(media_settings.disable)
+        super().setUpClass()
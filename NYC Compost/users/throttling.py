@@ -0,0 +1,123 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    count, period = rate.split("/")
+    return int(count), PERIODS[period[0]]
+
+
+class LocalCounters:
+    # used when the cache is unreachable, so throttling keeps working per process
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def incr(self, key, timeout):
+        now = time.monotonic()
+        with self.lock:
+            count, expires = self.counts.get(key, (0, now + timeout))
+            if expires <= now:
+                count, expires = 0, now + timeout
+            self.counts[key] = (count + 1, expires)
+            if len(self.counts) > 10000:
+                self.counts = {k: v for k, v in self.counts.items() if v[1] > now}
+            return count + 1
+
+    def get(self, key):
+        with self.lock:
+            count, expires = self.counts.get(key, (0, 0))
+        return count if expires > time.monotonic() else 0
+
+
+_local = LocalCounters()
+
+
+def _incr(key, timeout):
+    try:
+        cache = caches[settings.THROTTLE_CACHE]
+        cache.add(key, 0, timeout)
+        return cache.incr(key)
+    except Exception:
+        return _local.incr(key, timeout)
+
+
+def _get(key):
+    try:
+        return caches[settings.THROTTLE_CACHE].get(key, 0)
+    except Exception:
+        return _local.get(key)
+
+
+def hit(scope, ident):
+    # sliding window approximated from the current and previous fixed windows
+    limit, period = parse_rate(settings.THROTTLE_RATES[scope])
+    now = time.time()
+    window = int(now // period)
+    ident = hashlib.sha1(ident.encode()).hexdigest()
+
+    current = _incr(f"throttle:{scope}:{ident}:{window}", period * 2)
+    previous = _get(f"throttle:{scope}:{ident}:{window - 1}")
+    weight = 1 - (now % period) / period
+    return previous * weight + current <= limit
+
+
+def client_ip(request):
+    proxies = settings.THROTTLE_TRUSTED_PROXIES
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+    if proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(",")]
+        return addresses[max(len(addresses) - proxies, 0)]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def record(scope, allowed):
+    with _stats_lock:
+        _stats[(scope, "allowed" if allowed else "throttled")] += 1
+
+
+def throttle_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+class ThrottleMixin:
+    # checked before the form is validated, so throttled requests never reach
+    # password hashing or email rendering
+    throttle_scope = None
+    throttle_account_field = None
+
+    def post(self, request, *args, **kwargs):
+        if settings.THROTTLE_ENABLED and not self.throttle_allows(request):
+            return self.throttled(request)
+        return super().post(request, *args, **kwargs)
+
+    def throttle_allows(self, request):
+        allowed = hit(f"{self.throttle_scope}_ip", client_ip(request))
+        account = request.POST.get(self.throttle_account_field, "").strip().lower()
+        if allowed and account:
+            allowed = hit(f"{self.throttle_scope}_account", account)
+
+        record(self.throttle_scope, allowed)
+        return allowed
+
+    def throttled(self, request):
+        _, period = parse_rate(settings.THROTTLE_RATES[f"{self.throttle_scope}_ip"])
+        response = HttpResponse(
+            "Too many attempts. Please wait a moment and try again.",
+            status=429,
+            content_type="text/plain",
+        )
+        response["Retry-After"] = period
+        return response
@@ -1,8 +1,13 @@
 from django.urls import path
-from .views import home, profile, RegisterView
+from .views import home, profile, AvailabilityView, RegisterView
 
 urlpatterns = [
     path("", home, name="users-home"),
     path("register/", RegisterView.as_view(), name="users-register"),
+    path(
+        "register/availability/",
+        AvailabilityView.as_view(),
+        name="users-availability",
+    ),
     path("profile/", profile, name="users-profile"),
 ]
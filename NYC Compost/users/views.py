@@ -5,8 +5,21 @@ from django.contrib import messages
 from django.contrib.messages.views import SuccessMessageMixin
 from django.views import View
 from django.contrib.auth.decorators import login_required
-
-from .forms import RegisterForm, LoginForm, UpdateUserForm, UpdateProfileForm
+from django.conf import settings
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxLengthValidator, validate_email
+from django.http import JsonResponse
+
+from .forms import (
+    RegisterForm,
+    LoginForm,
+    ResetPasswordForm,
+    UpdateUserForm,
+    UpdateProfileForm,
+)
+from .availability import is_taken
+from .throttling import ThrottleMixin
 
 
 def home(request):
@@ -45,25 +58,57 @@ class RegisterView(View):
         return render(request, self.template_name, {"form": form})
 
 
+class AvailabilityView(ThrottleMixin, View):
+    # answers "available", "taken" or "invalid" for ?username= and ?email=,
+    # the form still checks both again when it is posted
+    throttle_scope = "availability"
+    validators = {
+        "username": [UnicodeUsernameValidator(), MaxLengthValidator(150)],
+        "email": [validate_email],
+    }
+
+    def get(self, request, *args, **kwargs):
+        if settings.THROTTLE_ENABLED and not self.throttle_allows(request):
+            return self.throttled(request)
+
+        results = {}
+        for field in self.validators:
+            value = request.GET.get(field, "").strip()
+            if value:
+                results[field] = self.check(field, value)
+        return JsonResponse(results)
+
+    def check(self, field, value):
+        try:
+            for validator in self.validators[field]:
+                validator(value)
+        except ValidationError:
+            return "invalid"
+        return "taken" if is_taken(field, value) else "available"
+
+
 # Class based view that extends from the built in login view to add a remember me functionality
-class CustomLoginView(LoginView):
+class CustomLoginView(ThrottleMixin, LoginView):
     form_class = LoginForm
+    throttle_scope = "login"
+    throttle_account_field = "username"
 
     def form_valid(self, form):
         remember_me = form.cleaned_data.get("remember_me")
 
         if not remember_me:
             # set session expiry to 0 seconds. So it will automatically close the session after the browser is closed.
+            # This marks the session as modified, so the cookie is saved with the login.
             self.request.session.set_expiry(0)
 
-            # Set session as modified to force data updates/cookie to be saved.
-            self.request.session.modified = True
-
         # else browser session will be as long as the session cookie time "SESSION_COOKIE_AGE" defined in settings.py
         return super(CustomLoginView, self).form_valid(form)
 
 
-class ResetPasswordView(SuccessMessageMixin, PasswordResetView):
+class ResetPasswordView(ThrottleMixin, SuccessMessageMixin, PasswordResetView):
+    throttle_scope = "password_reset"
+    throttle_account_field = "email"
+    form_class = ResetPasswordForm
     template_name = "users/password_reset.html"
     email_template_name = "users/password_reset_email.html"
     subject_template_name = "users/password_reset_subject"
@@ -0,0 +1,118 @@
+import mimetypes
+import os
+import re
+from wsgiref.headers import Headers
+
+# ManifestStaticFilesStorage inserts the first 12 hex digits of the md5
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.")
+IMMUTABLE = "public, max-age=31536000, immutable"
+SHORT = "public, max-age=3600"
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in header.split(","):
+        coding, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFile:
+    def __init__(self, path, url):
+        self.path = path
+        self.cache_control = IMMUTABLE if HASHED_NAME.search(url) else SHORT
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/") or self.content_type.endswith(
+            "javascript"
+        ):
+            self.content_type += "; charset=utf-8"
+        self.variants = {}
+        for encoding, suffix in ENCODINGS + ((None, ""),):
+            if os.path.isfile(path + suffix):
+                stat = os.stat(path + suffix)
+                etag = '"%x-%x%s"' % (int(stat.st_mtime), stat.st_size, suffix)
+                self.variants[encoding] = (path + suffix, stat.st_size, etag)
+
+    def choose(self, accept_encoding):
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and encoding in accepted:
+                return encoding, self.variants[encoding]
+        return None, self.variants[None]
+
+
+class StaticFiles:
+    # serves collectstatic output in front of Django: files are indexed once at
+    # startup, precompressed copies are negotiated and validators answered
+    # without touching the filesystem, anything else goes to the application
+    def __init__(self, application, root, prefix):
+        self.application = application
+        self.prefix = "/" + prefix.strip("/") + "/"
+        self.files = {}
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith((".gz", ".br")) and os.path.isfile(
+                    os.path.join(directory, filename[:-3])
+                ):
+                    continue
+                path = os.path.join(directory, filename)
+                url = self.prefix + os.path.relpath(path, root).replace(os.sep, "/")
+                self.files[url] = StaticFile(path, url)
+
+    def __call__(self, environ, start_response):
+        static_file = self.files.get(environ.get("PATH_INFO", ""))
+        if static_file is None:
+            return self.application(environ, start_response)
+
+        method = environ["REQUEST_METHOD"]
+        if method not in ("GET", "HEAD"):
+            start_response(
+                "405 Method Not Allowed",
+                [("Allow", "GET, HEAD"), ("Content-Length", "0")],
+            )
+            return []
+
+        encoding, (path, size, etag) = static_file.choose(
+            environ.get("HTTP_ACCEPT_ENCODING", "")
+        )
+        headers = Headers(
+            [
+                ("Cache-Control", static_file.cache_control),
+                ("ETag", etag),
+                ("Vary", "Accept-Encoding"),
+            ]
+        )
+        if_none_match = environ.get("HTTP_IF_NONE_MATCH", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or (
+            if_none_match.strip() == "*"
+        ):
+            start_response("304 Not Modified", headers.items())
+            return []
+
+        headers["Content-Type"] = static_file.content_type
+        headers["Content-Length"] = str(size)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        start_response("200 OK", headers.items())
+        if method == "HEAD":
+            return []
+        f = open(path, "rb")
+        file_wrapper = environ.get("wsgi.file_wrapper")
+        if file_wrapper is not None:
+            return file_wrapper(f, 64 * 1024)
+        return read_chunks(f)
+
+
+def read_chunks(f):
+    with f:
+        yield from iter(lambda: f.read(64 * 1024), b"")